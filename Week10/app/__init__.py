@@ -2,15 +2,30 @@ from flask import Flask
 from app.extensions import db, jwt, limiter, metrics
 from app.auth.routes import auth_bp
 from app.books.routes import books_bp
+from app.cache import response_cache
+from app.json_provider import FastJSONProvider
 import logging
+import os
 import sys
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///library.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = '482e91425bd0a7ad5e00d94544cbc345'
+    app.config['BULK_CHUNK_SIZE'] = 1000
+    app.config['BULK_MAX_ERRORS'] = 100
+    app.config['EXPORT_BATCH_SIZE'] = 1000
+    app.config['RESPONSE_CACHE_SIZE'] = 1024
+    app.config['RESPONSE_CACHE_TTL'] = 30
+    app.config['RESPONSE_CACHE_MAX_BYTES'] = 32 * 1024 * 1024
+    # Keep the shared counters out of the working directory, next to the app database.
+    os.makedirs(app.instance_path, exist_ok=True)
+    app.config['RATELIMIT_STORAGE_URI'] = 'sqlite:///' + os.path.join(app.instance_path, 'ratelimit.db')
+    app.config['RATELIMIT_STORAGE_OPTIONS'] = {'max_keys': 100_000}
+    app.config['RATELIMIT_STRATEGY'] = 'sliding-window-counter'
 
     logging.basicConfig(
         level=logging.INFO,
@@ -24,6 +39,7 @@ def create_app():
     jwt.init_app(app)
     limiter.init_app(app)
     metrics.init_app(app)
+    response_cache.init_app(app)
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(books_bp, url_prefix='/books')
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from flask import current_app, request
+from sqlalchemy import insert
+
+BULK_FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+
+def iter_bulk_rows():
+    """Yield (line, row, error) from an NDJSON or CSV request body, one line at a time."""
+    fmt = BULK_FORMATS.get(request.mimetype)
+    if fmt is None:
+        raise ValueError("Content-Type must be application/x-ndjson or text/csv")
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, "Too many columns"
+            else:
+                yield reader.line_num, {k: v for k, v in row.items() if v not in ('', None)}, None
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            yield line, None, "Invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield line, None, "Row must be a JSON object"
+            continue
+        yield line, row, None
+
+def bulk_import(session, model, validate):
+    """Stream the request body into `model` with one executemany INSERT and commit per chunk.
+
+    `validate(row)` returns the column values for a row or raises ValueError; rejected
+    rows are counted and the first BULK_MAX_ERRORS are reported by line number.
+    """
+    chunk_size = current_app.config.get('BULK_CHUNK_SIZE', 1000)
+    max_errors = current_app.config.get('BULK_MAX_ERRORS', 100)
+    report = {"inserted": 0, "failed": 0, "errors": []}
+    chunk = []
+
+    def flush():
+        session.execute(insert(model), chunk)
+        session.commit()
+        report["inserted"] += len(chunk)
+        chunk.clear()
+
+    for line, row, error in iter_bulk_rows():
+        if error is None:
+            try:
+                chunk.append(validate(row))
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            report["failed"] += 1
+            if len(report["errors"]) < max_errors:
+                report["errors"].append({"line": line, "error": error})
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return report
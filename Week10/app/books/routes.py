@@ -1,6 +1,9 @@
-from flask import Blueprint, request, jsonify
-from app.models import Book
+from flask import Blueprint, current_app, request, jsonify
+from app.models import Book, BOOK_COLUMNS
 from app.extensions import db, limiter
+from app.books.bulk import bulk_import
+from app.cache import cached_response, response_cache
+from app.books.export import EXPORT_FORMATS, stream_export
 from flask_jwt_extended import jwt_required
 import logging
 
@@ -9,9 +12,24 @@ logger = logging.getLogger(__name__)
 
 @books_bp.route('/', methods=['GET'])
 @limiter.limit("20 per minute")
+@cached_response('books')
 def get_books():
-    books = Book.query.all()
-    return jsonify([book.to_dict() for book in books]), 200
+    result = db.session.execute(db.select(*BOOK_COLUMNS))
+    keys = tuple(result.keys())
+    return jsonify([dict(zip(keys, row)) for row in result]), 200
+
+@books_bp.route('/export', methods=['GET'])
+@limiter.limit("20 per minute")
+def export_books():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": "format must be ndjson or json"}), 400
+    query = (
+        db.select(*BOOK_COLUMNS)
+        .order_by(Book.id)
+        .execution_options(yield_per=current_app.config['EXPORT_BATCH_SIZE'])
+    )
+    return stream_export(db.session.execute(query).mappings().partitions(), fmt)
 
 @books_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -20,14 +38,34 @@ def add_book():
     new_book = Book(title=data['title'], author=data['author'])
     db.session.add(new_book)
     db.session.commit()
+    response_cache.invalidate('books')
     logger.info(f"Book added: {new_book.title}")
     return jsonify(new_book.to_dict()), 201
 
+@books_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_add_books():
+    def validate(row):
+        title, author = row.get('title'), row.get('author')
+        if not isinstance(title, str) or not isinstance(author, str) or not title or not author:
+            raise ValueError("title and author are required")
+        return {"title": title, "author": author, "available": True}
+
+    try:
+        report = bulk_import(db.session, Book, validate)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if report['inserted']:
+        response_cache.invalidate('books')
+    logger.info(f"Bulk import: {report['inserted']} books added, {report['failed']} rejected")
+    return jsonify(report), 200
+
 @books_bp.route('/<int:book_id>', methods=['DELETE'])
 @jwt_required()
 def delete_book(book_id):
     book = Book.query.get_or_404(book_id)
     db.session.delete(book)
     db.session.commit()
+    response_cache.invalidate('books', f'book:{book_id}')
     logger.info(f"Book deleted ID: {book_id}")
     return jsonify({"message": "Book deleted"}), 200
\ No newline at end of file
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request
+from prometheus_client import Counter, Gauge
+
+CACHE_LOOKUPS = Counter(
+    'response_cache_lookups_total', 'Response cache lookups by view and result (hit/miss)', ['view', 'result']
+)
+CACHE_ENTRIES = Gauge('response_cache_entries', 'Responses held in the response cache')
+CACHE_BYTES = Gauge('response_cache_bytes', 'Size of the response bodies held in the response cache')
+
+class ResponseCache:
+    """In-process LRU of GET response bodies with a TTL, an entry cap and a byte cap.
+
+    Keys embed the current generation of the tags a view depends on ('books' for
+    listings, 'book:7' for one book); writes call `invalidate`, which bumps those
+    generations so older entries stop matching and age out of the LRU. The key is
+    taken before the view runs, so a body read while a write commits is stored
+    under the old generation and never served. A body larger than `max_bytes` is
+    not stored.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30, max_bytes=32 * 1024 * 1024, max_tags=100_000):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_tags = max_tags
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('RESPONSE_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+        self.max_bytes = app.config.get('RESPONSE_CACHE_MAX_BYTES', self.max_bytes)
+        CACHE_ENTRIES.set_function(lambda: len(self._entries))
+        CACHE_BYTES.set_function(lambda: self._bytes)
+
+    def key(self, base, tags):
+        with self._lock:
+            return (self._epoch, base, tuple(self._generations.get(tag, 0) for tag in tags))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, size=0):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Storing it would evict everything else and then the entry itself.
+                return
+            self._entries[key] = (expires_at, value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.maxsize or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, *tags):
+        with self._lock:
+            if len(self._generations) >= self.max_tags:
+                # Forget per-tag generations rather than grow forever; the new epoch misses everything.
+                self._generations.clear()
+                self._epoch += 1
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+response_cache = ResponseCache()
+
+def cached_response(*tags):
+    """Serve a GET view from `response_cache`, keyed by path and query string.
+
+    `tags` may use the view's arguments, e.g. 'book:{book_id}'. Only 200 responses
+    are stored, and cached views must return the same body to every caller. Hits
+    and misses are counted per view in `response_cache_lookups_total`.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            base = (request.path, tuple(sorted(request.args.items(multi=True))))
+            key = response_cache.key(base, [tag.format(**kwargs) for tag in tags])
+            cached = response_cache.get(key)
+            if cached is not None:
+                CACHE_LOOKUPS.labels(request.endpoint, 'hit').inc()
+                body, mimetype = cached
+                return current_app.response_class(body, mimetype=mimetype)
+            CACHE_LOOKUPS.labels(request.endpoint, 'miss').inc()
+            resp = make_response(fn(*args, **kwargs))
+            if resp.status_code == 200 and not resp.is_streamed:
+                body = resp.get_data()
+                response_cache.set(key, (body, resp.mimetype), size=len(body))
+            return resp
+        return wrapper
+    return decorator
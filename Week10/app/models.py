@@ -24,4 +24,8 @@ class Book(db.Model):
             "title": self.title,
             "author": self.author,
             "available": self.available
-        }
\ No newline at end of file
+        }
+
+# The columns of Book.to_dict, for read-only listings that select plain rows
+# instead of hydrating Book objects.
+BOOK_COLUMNS = (Book.id, Book.title, Book.author, Book.available)
@@ -0,0 +1,168 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from flask_limiter.util import get_remote_address
+from jwt import PyJWTError
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+def rate_limit_key():
+    """Limit signed-in users by JWT identity and everyone else by client address."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except (JWTExtendedException, PyJWTError):
+        identity = None
+    if identity is not None:
+        return f'user:{identity}'
+    return get_remote_address()
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate limit counters in a local SQLite file, shared by every worker on the host.
+
+    Use it with `RATELIMIT_STORAGE_URI = 'sqlite:///<path>/ratelimit.db'` and the
+    fixed-window or sliding-window-counter strategy. Each check is one short
+    transaction on a WAL database, so workers see the same counts without a
+    network round-trip. Every `prune_every` writes, expired counters are deleted
+    and, above `max_keys`, the counters closest to expiry are evicted first.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, max_keys=100_000, prune_every=1000, **options):
+        self.path = urlparse(uri).path[1:] if uri else 'ratelimit.db'
+        self.max_keys = int(max_keys)
+        self.prune_every = int(prune_every)
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._local = threading.local()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        with self._transaction() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS counters ('
+                'key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS counters_expires_at ON counters (expires_at)')
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conn(self):
+        # One connection per thread, reopened after a fork (gunicorn --preload).
+        conn, pid = getattr(self._local, 'conn', (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = (conn, os.getpid())
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _incr(self, conn, key, expiry, amount, now):
+        with self._writes_lock:
+            self._writes += 1
+        return conn.execute(
+            'INSERT INTO counters (key, count, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            'count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END, '
+            'expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END '
+            'RETURNING count',
+            (key, amount, now + expiry, now, now),
+        ).fetchone()[0]
+
+    def _get(self, conn, key, now):
+        row = conn.execute('SELECT count FROM counters WHERE key = ? AND expires_at > ?', (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def _maybe_prune(self, now):
+        with self._writes_lock:
+            if self._writes < self.prune_every:
+                return
+            self._writes = 0
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM counters WHERE expires_at <= ?', (now,))
+            excess = conn.execute('SELECT COUNT(*) FROM counters').fetchone()[0] - self.max_keys
+            if excess > 0:
+                conn.execute(
+                    'DELETE FROM counters WHERE key IN (SELECT key FROM counters ORDER BY expires_at LIMIT ?)',
+                    (excess,),
+                )
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        with self._transaction() as conn:
+            count = self._incr(conn, key, expiry, amount, now)
+        self._maybe_prune(now)
+        return count
+
+    def get(self, key):
+        return self._get(self._conn(), key, time.time())
+
+    def get_expiry(self, key):
+        row = self._conn().execute('SELECT expires_at FROM counters WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self._conn().execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._transaction() as conn:
+            return conn.execute('DELETE FROM counters').rowcount
+
+    def clear(self, key):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM counters WHERE key = ?', (key,))
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        # Read and increment in one write transaction, so concurrent workers can't both take the last slot.
+        with self._transaction() as conn:
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(conn, previous_key, current_key, expiry, now)
+            if math.floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+        self._maybe_prune(now)
+        return True
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._sliding_window(self._conn(), previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM counters WHERE key IN (?, ?)', (previous_key, current_key))
+
+    def _sliding_window(self, conn, previous_key, current_key, expiry, now):
+        previous_count = self._get(conn, previous_key, now)
+        current_count = self._get(conn, current_key, now)
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
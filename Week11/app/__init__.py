@@ -2,16 +2,49 @@ from flask import Flask
 from app.extensions import db, jwt, limiter, metrics
 from app.auth.routes import auth_bp
 from app.books.routes import books_bp
+from app.core.outbox import relay
+from app.core.cache import response_cache
+from app.json_provider import FastJSONProvider
 from flasgger import Swagger
 import logging
+import os
 import sys
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///library.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = 'your-super-secret-key'
+    app.config['BULK_CHUNK_SIZE'] = 1000
+    app.config['BULK_MAX_ERRORS'] = 100
+    app.config['EXPORT_BATCH_SIZE'] = 1000
+    app.config['RESPONSE_CACHE_SIZE'] = 1024
+    app.config['RESPONSE_CACHE_TTL'] = 30
+    app.config['RESPONSE_CACHE_MAX_BYTES'] = 32 * 1024 * 1024
+    # Keep the shared counters out of the working directory, next to the app database.
+    os.makedirs(app.instance_path, exist_ok=True)
+    app.config['RATELIMIT_STORAGE_URI'] = 'sqlite:///' + os.path.join(app.instance_path, 'ratelimit.db')
+    app.config['RATELIMIT_STORAGE_OPTIONS'] = {'max_keys': 100_000}
+    app.config['RATELIMIT_STRATEGY'] = 'sliding-window-counter'
+
+    app.config['WEBHOOK_ENGINE'] = 'threads'
+    app.config['WEBHOOK_TIMEOUT'] = 5
+    app.config['WEBHOOK_WORKERS'] = 4
+    app.config['WEBHOOK_QUEUE_SIZE'] = 1000
+    app.config['WEBHOOK_MAX_PER_SUBSCRIBER'] = 2
+    app.config['WEBHOOK_QUEUE_POLICY'] = 'drop_oldest'
+    app.config['WEBHOOK_ASYNC_QUEUE_SIZE'] = 10000
+    app.config['WEBHOOK_ASYNC_MAX_IN_FLIGHT'] = 1000
+    app.config['WEBHOOK_ASYNC_MAX_PER_HOST'] = 10
+    app.config['WEBHOOK_OUTBOX_BATCH_SIZE'] = 100
+    app.config['WEBHOOK_OUTBOX_POLL_INTERVAL'] = 1.0
+    app.config['WEBHOOK_OUTBOX_LEASE'] = 60
+    app.config['WEBHOOK_OUTBOX_MAX_PER_SUBSCRIBER'] = 20
+    app.config['WEBHOOK_MAX_ATTEMPTS'] = 8
+    app.config['WEBHOOK_BACKOFF_BASE'] = 2.0
+    app.config['WEBHOOK_BACKOFF_MAX'] = 600.0
 
     app.config['SWAGGER'] = {
         'title': 'Library API Documentation',
@@ -28,6 +61,7 @@ def create_app():
     jwt.init_app(app)
     limiter.init_app(app)
     metrics.init_app(app)
+    response_cache.init_app(app)
     
     Swagger(app, template_file='../swagger.yaml')
 
@@ -37,4 +71,6 @@ def create_app():
     with app.app_context():
         db.create_all()
 
+    relay.init_app(app)
+
     return app
\ No newline at end of file
@@ -0,0 +1,38 @@
+import csv
+import io
+import json
+from flask import request
+
+BULK_FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+
+def iter_bulk_rows():
+    """Yield (line, row, error) from an NDJSON or CSV request body, one line at a time."""
+    fmt = BULK_FORMATS.get(request.mimetype)
+    if fmt is None:
+        raise ValueError("Content-Type must be application/x-ndjson or text/csv")
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, "Too many columns"
+            else:
+                yield reader.line_num, {k: v for k, v in row.items() if v not in ('', None)}, None
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            yield line, None, "Invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield line, None, "Row must be a JSON object"
+            continue
+        yield line, row, None
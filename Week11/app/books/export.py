@@ -0,0 +1,20 @@
+import json
+from flask import Response, stream_with_context
+
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+
+def stream_export(partitions, fmt):
+    """Response that writes each batch of row dicts as soon as it is fetched."""
+    def generate():
+        if fmt == 'ndjson':
+            for rows in partitions:
+                yield ''.join(json.dumps(dict(row)) + '\n' for row in rows)
+            return
+        sep = ''
+        yield '['
+        for rows in partitions:
+            yield sep + ','.join(json.dumps(dict(row)) for row in rows)
+            sep = ','
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt])
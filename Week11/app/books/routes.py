@@ -1,6 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.core.services import BookService, WebhookService
+from app.core.cache import cached_response
+from app.books.bulk import iter_bulk_rows
+from app.books.export import EXPORT_FORMATS, stream_export
 
 books_bp = Blueprint('books', __name__)
 
@@ -8,9 +11,17 @@ book_service = BookService()
 webhook_service = WebhookService()
 
 @books_bp.route('/', methods=['GET'])
+@cached_response('books')
 def get_books():
     return jsonify(book_service.get_books()), 200
 
+@books_bp.route('/export', methods=['GET'])
+def export_books():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": "format must be ndjson or json"}), 400
+    return stream_export(book_service.export_books(current_app.config['EXPORT_BATCH_SIZE']), fmt)
+
 @books_bp.route('/', methods=['POST'])
 @jwt_required()
 def add_book():
@@ -18,6 +29,19 @@ def add_book():
     book = book_service.add_book(data['title'], data['author'])
     return jsonify(book), 201
 
+@books_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_add_books():
+    try:
+        report = book_service.import_books(
+            iter_bulk_rows(),
+            chunk_size=current_app.config['BULK_CHUNK_SIZE'],
+            max_errors=current_app.config['BULK_MAX_ERRORS'],
+        )
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify(report), 200
+
 @books_bp.route('/<int:book_id>', methods=['DELETE'])
 @jwt_required()
 def delete_book(book_id):
@@ -33,9 +57,15 @@ def register_webhook():
     current_user_id = get_jwt_identity()
     data = request.get_json()
     
-    webhook = webhook_service.register_webhook(
-        user_id=current_user_id,
-        url=data['url'],
-        event_type=data['event']
-    )
+    try:
+        webhook = webhook_service.register_webhook(
+            user_id=current_user_id,
+            url=data['url'],
+            event_type=data['event'],
+            delivery_mode=data.get('delivery_mode', 'single'),
+            batch_window_ms=data.get('batch_window_ms'),
+            batch_max_events=data.get('batch_max_events')
+        )
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     return jsonify({"message": "Webhook registered", "data": webhook}), 201
\ No newline at end of file
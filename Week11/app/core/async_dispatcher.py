@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import ssl
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+class _HostPool:
+    def __init__(self, limit):
+        self.slots = asyncio.Semaphore(limit)
+        self.idle = deque()
+
+class AsyncWebhookDispatcher:
+    """Webhook engine running every delivery as a coroutine on one event-loop thread.
+
+    Connections are kept alive and reused per host (at most `max_per_host` open at
+    once), `max_in_flight` caps concurrent requests across all hosts and `timeout`
+    is a deadline for the whole request, connect included. Same interface as
+    WebhookDispatcher, so the outbox relay can use either engine.
+    """
+
+    def __init__(self, queue_size=10000, max_in_flight=1000, max_per_host=10, timeout=5):
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+
+        self.stats = {"submitted": 0, "delivered": 0, "failed": 0, "dropped": 0}
+
+        self._lock = threading.Lock()
+        self._size = 0
+        self._loop = None
+        self._in_flight = None
+        self._pools = {}
+        self._ssl = None
+
+    def init_app(self, app):
+        self.queue_size = app.config.get("WEBHOOK_ASYNC_QUEUE_SIZE", self.queue_size)
+        self.max_in_flight = app.config.get("WEBHOOK_ASYNC_MAX_IN_FLIGHT", self.max_in_flight)
+        self.max_per_host = app.config.get("WEBHOOK_ASYNC_MAX_PER_HOST", self.max_per_host)
+        self.timeout = app.config.get("WEBHOOK_TIMEOUT", self.timeout)
+
+    def capacity(self):
+        with self._lock:
+            return max(0, self.queue_size - self._size)
+
+    def submit(self, url, payload, callback=None):
+        """Schedule one delivery. Returns False if the engine is already at `queue_size`."""
+        with self._lock:
+            self._start()
+            if self._size >= self.queue_size:
+                self.stats["dropped"] += 1
+                logger.warning(f"Webhook queue full, dropping delivery to {url}")
+                if callback:
+                    callback(False, "dispatcher queue full")
+                return False
+            self._size += 1
+            self.stats["submitted"] += 1
+
+        body = json.dumps(payload).encode("utf-8")
+        asyncio.run_coroutine_threadsafe(self._deliver(url, body, callback), self._loop)
+        return True
+
+    def _start(self):
+        if self._loop:
+            return
+
+        self._loop = asyncio.new_event_loop()
+        self._ssl = ssl.create_default_context()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="webhook-event-loop", daemon=True).start()
+        ready.wait()
+
+    async def _deliver(self, url, body, callback):
+        ok, error = False, None
+        try:
+            logger.info(f"Triggering webhook to {url}")
+            parts = urlsplit(url)
+            pool = self._pool(parts)
+            # Wait for the host slot before taking a global one, so a slow host only
+            # ever ties up `max_per_host` of the in-flight budget.
+            async with pool.slots, self._in_flight:
+                async with asyncio.timeout(self.timeout):
+                    status = await self._post(pool, parts, body)
+            ok = 200 <= status < 300
+            if not ok:
+                error = f"HTTP {status}"
+        except TimeoutError:
+            error = f"timed out after {self.timeout}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        if error:
+            logger.error(f"Failed to send webhook to {url}: {error}")
+
+        with self._lock:
+            self._size -= 1
+            self.stats["delivered" if ok else "failed"] += 1
+        if callback:
+            callback(ok, error)
+
+    def _pool(self, parts):
+        key = (parts.scheme, parts.hostname, parts.port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _HostPool(self.max_per_host)
+        return pool
+
+    async def _post(self, pool, parts, body):
+        https = parts.scheme == "https"
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n"
+            "\r\n"
+        ).encode("latin-1") + body
+
+        while pool.idle:
+            reader, writer = pool.idle.pop()
+            if reader.at_eof() or writer.is_closing():
+                writer.close()
+                continue
+            try:
+                return await self._exchange(pool, reader, writer, request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server closed an idle keep-alive connection; retry on a new one.
+                pass
+
+        port = parts.port or (443 if https else 80)
+        reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=self._ssl if https else None)
+        return await self._exchange(pool, reader, writer, request)
+
+    async def _exchange(self, pool, reader, writer, request):
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await self._read_response(reader)
+        except BaseException:
+            writer.close()
+            raise
+
+        if keep_alive:
+            pool.idle.append((reader, writer))
+        else:
+            writer.close()
+        return status
+
+    async def _read_response(self, reader):
+        # Interim 1xx responses (e.g. 100 Continue) come before the final one; skip them.
+        while True:
+            version, status, headers = await self._read_head(reader)
+            if not 100 <= status < 200:
+                break
+
+        connection = headers.get("connection", "")
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        # RFC 9112 6.3: 204 and 304 never carry a body, whatever the headers say.
+        # (Requests here are always POST, so the HEAD case doesn't arise.)
+        if status in (204, 304):
+            return status, keep_alive
+
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        else:
+            await reader.read()
+            keep_alive = False
+
+        return status, keep_alive
+
+    async def _read_head(self, reader):
+        version, status = (await reader.readuntil(b"\r\n")).decode("latin-1").split()[:2]
+        headers = {}
+        while True:
+            line = (await reader.readuntil(b"\r\n")).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+        return version, int(status), headers
+
+
+async_dispatcher = AsyncWebhookDispatcher()
@@ -0,0 +1,162 @@
+import itertools
+import logging
+import threading
+from collections import OrderedDict, defaultdict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+QUEUE_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class WebhookDispatcher:
+    """Fixed-size worker pool that fans webhook deliveries out to subscribers.
+
+    Jobs are queued per subscriber URL and workers pick subscribers round-robin,
+    skipping any that already have `max_per_subscriber` deliveries in flight, so
+    one slow endpoint can never occupy the whole pool. When the queue is full,
+    `drop_oldest` drops the earliest submitted job across all subscribers.
+    """
+
+    def __init__(self, workers=4, queue_size=1000, max_per_subscriber=2,
+                 timeout=5, policy="drop_oldest", block_timeout=1.0):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_per_subscriber = max_per_subscriber
+        self.timeout = timeout
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self.stats = {"submitted": 0, "delivered": 0, "failed": 0, "dropped": 0}
+
+        # Workers wait on _not_empty and blocked submitters on _not_full, as in queue.Queue,
+        # so a notify always wakes a thread that can use it.
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._seq = itertools.count()
+        self._pending = OrderedDict()  # url -> deque of (seq, payload, callback)
+        self._in_flight = defaultdict(int)
+        self._size = 0
+        self._threads = []
+        self._session = None
+
+    def init_app(self, app):
+        self.workers = app.config.get("WEBHOOK_WORKERS", self.workers)
+        self.queue_size = app.config.get("WEBHOOK_QUEUE_SIZE", self.queue_size)
+        self.max_per_subscriber = app.config.get("WEBHOOK_MAX_PER_SUBSCRIBER", self.max_per_subscriber)
+        self.timeout = app.config.get("WEBHOOK_TIMEOUT", self.timeout)
+        self.policy = app.config.get("WEBHOOK_QUEUE_POLICY", self.policy)
+        if self.policy not in QUEUE_POLICIES:
+            raise ValueError(f"WEBHOOK_QUEUE_POLICY must be one of {QUEUE_POLICIES}")
+
+    def capacity(self):
+        with self._lock:
+            return max(0, self.queue_size - self._size)
+
+    def submit(self, url, payload, callback=None):
+        """Queue one delivery. Returns False if the job was rejected or dropped.
+
+        `callback(ok, error)` is called once the delivery finishes or is dropped;
+        it runs on a worker thread (or under the queue lock) and must be cheap.
+        """
+        with self._lock:
+            self._start()
+            if self._size >= self.queue_size and not self._make_room():
+                self.stats["dropped"] += 1
+                logger.warning(f"Webhook queue full, dropping delivery to {url}")
+                if callback:
+                    callback(False, "dispatcher queue full")
+                return False
+
+            self._pending.setdefault(url, deque()).append((next(self._seq), payload, callback))
+            self._size += 1
+            self.stats["submitted"] += 1
+            self._not_empty.notify()
+            return True
+
+    def _make_room(self):
+        if self.policy == "block":
+            return self._not_full.wait_for(lambda: self._size < self.queue_size, self.block_timeout)
+
+        if self.policy == "drop_oldest" and self._pending:
+            # Each subscriber's deque is in submit order, so the oldest job is one of the heads.
+            url = min(self._pending, key=lambda u: self._pending[u][0][0])
+            jobs = self._pending[url]
+            _, _, callback = jobs.popleft()
+            if callback:
+                callback(False, "dropped from dispatcher queue")
+            if not jobs:
+                del self._pending[url]
+            self._size -= 1
+            self.stats["dropped"] += 1
+            logger.warning(f"Webhook queue full, dropped oldest delivery to {url}")
+            return True
+
+        return False
+
+    def _start(self):
+        if self._threads:
+            return
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"webhook-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        for url, jobs in self._pending.items():
+            if jobs and self._in_flight.get(url, 0) < self.max_per_subscriber:
+                _, payload, callback = jobs.popleft()
+                if jobs:
+                    self._pending.move_to_end(url)
+                else:
+                    del self._pending[url]
+                return url, payload, callback
+        return None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                job = self._next_job()
+                while job is None:
+                    self._not_empty.wait()
+                    job = self._next_job()
+                url, payload, callback = job
+                self._in_flight[url] += 1
+                self._size -= 1
+                self._not_full.notify()
+
+            ok, error = False, "worker interrupted"
+            try:
+                ok, error = self._deliver(url, payload)
+            finally:
+                with self._lock:
+                    self.stats["delivered" if ok else "failed"] += 1
+                    self._in_flight[url] -= 1
+                    if self._in_flight[url] == 0:
+                        del self._in_flight[url]
+                    # A job held back by max_per_subscriber may be runnable now.
+                    self._not_empty.notify()
+                if callback:
+                    callback(ok, error)
+
+    def _deliver(self, url, payload):
+        try:
+            logger.info(f"Triggering webhook to {url}")
+            response = self._session.post(url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return True, None
+        except Exception as e:
+            logger.error(f"Failed to send webhook to {url}: {e}")
+            return False, str(e)
+
+
+dispatcher = WebhookDispatcher()
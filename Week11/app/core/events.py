@@ -1,24 +1,24 @@
-import requests
-import threading
 import logging
-from app.core.repositories import WebhookRepository
+from app.core.repositories import WebhookRepository, OutboxRepository
+from app.core.outbox import relay
 
 logger = logging.getLogger(__name__)
 
 class EventManager:
     def __init__(self):
         self.webhook_repo = WebhookRepository()
+        self.outbox_repo = OutboxRepository()
+        self.relay = relay
 
     def notify(self, event_type, payload):
+        """Stage deliveries in the outbox; they are sent once the caller commits."""
         subscribers = self.webhook_repo.get_by_event(event_type)
-        
-        thread = threading.Thread(target=self._send_webhooks, args=(subscribers, payload))
-        thread.start()
+        self.outbox_repo.stage(subscribers, event_type, payload)
 
-    def _send_webhooks(self, subscribers, payload):
-        for sub in subscribers:
-            try:
-                logger.info(f"Triggering webhook to {sub.url}")
-                requests.post(sub.url, json=payload, timeout=5)
-            except Exception as e:
-                logger.error(f"Failed to send webhook to {sub.url}: {e}")
\ No newline at end of file
+    def notify_many(self, event_type, payloads):
+        subscribers = self.webhook_repo.get_by_event(event_type)
+        self.outbox_repo.stage_many(subscribers, event_type, payloads)
+
+    def publish(self):
+        """Wake the relay right after commit instead of waiting for its next poll."""
+        self.relay.wake()
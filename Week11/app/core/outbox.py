@@ -0,0 +1,154 @@
+import json
+import logging
+import random
+import threading
+from collections import Counter, deque
+from datetime import timedelta
+from functools import partial
+from app.core.dispatcher import dispatcher
+from app.core.async_dispatcher import async_dispatcher
+from app.core.repositories import OutboxRepository
+from app.extensions import db
+from app.models import utcnow
+
+logger = logging.getLogger(__name__)
+
+class OutboxRelay:
+    """Background loop that moves outbox rows to the webhook dispatcher.
+
+    Each pass records finished deliveries, renews the lease of rows still queued or
+    in flight, then claims due rows, at most `max_per_subscriber` outstanding per
+    subscriber URL, so one slow subscriber's backlog can't hold up the rest. Results
+    only update rows still held under the claim they were sent with. Failures are
+    retried with exponential backoff and jitter until `max_attempts`, after which
+    the row is marked `dead`.
+    """
+
+    def __init__(self, dispatcher, batch_size=100, poll_interval=1.0, max_attempts=8,
+                 backoff_base=2.0, backoff_max=600.0, lease_seconds=60, max_per_subscriber=20):
+        self.dispatcher = dispatcher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.max_per_subscriber = max_per_subscriber
+
+        self.outbox_repo = OutboxRepository()
+        self.app = None
+        self._results = deque()
+        self._leases = Counter()  # claim_token -> results still outstanding
+        self._outstanding = Counter()  # url -> deliveries submitted but not yet recorded
+        self._wake = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        engines = {'threads': dispatcher, 'asyncio': async_dispatcher}
+        engine = app.config.get('WEBHOOK_ENGINE', 'threads')
+        if engine not in engines:
+            raise ValueError(f"WEBHOOK_ENGINE must be one of {tuple(engines)}")
+        self.dispatcher = engines[engine]
+        self.dispatcher.init_app(app)
+        self.batch_size = app.config.get('WEBHOOK_OUTBOX_BATCH_SIZE', self.batch_size)
+        self.poll_interval = app.config.get('WEBHOOK_OUTBOX_POLL_INTERVAL', self.poll_interval)
+        self.max_attempts = app.config.get('WEBHOOK_MAX_ATTEMPTS', self.max_attempts)
+        self.backoff_base = app.config.get('WEBHOOK_BACKOFF_BASE', self.backoff_base)
+        self.backoff_max = app.config.get('WEBHOOK_BACKOFF_MAX', self.backoff_max)
+        self.lease_seconds = app.config.get('WEBHOOK_OUTBOX_LEASE', self.lease_seconds)
+        self.max_per_subscriber = app.config.get('WEBHOOK_OUTBOX_MAX_PER_SUBSCRIBER', self.max_per_subscriber)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='webhook-outbox-relay', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def backoff(self, attempts):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    self._record_results()
+                    self._renew_leases()
+                    while self._dispatch_batch():
+                        pass
+                except Exception:
+                    logger.exception("Webhook outbox relay pass failed")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def _dispatch_batch(self):
+        # Fairness comes from the per-subscriber cap in claim(); capacity() is only a
+        # ceiling so a pass never submits more than the queue can take without dropping.
+        limit = min(self.batch_size, self.dispatcher.capacity())
+        if limit <= 0:
+            return False
+
+        batches = self.outbox_repo.claim_batches(limit, self.lease_seconds)
+        for url, events in batches:
+            self._submit(url, events, [json.loads(event.payload) for event in events])
+        limit -= len(batches)
+
+        events = []
+        if limit > 0:
+            events = self.outbox_repo.claim(limit, self.lease_seconds, self.max_per_subscriber, self._outstanding)
+        for event in events:
+            self._submit(event.url, [event], json.loads(event.payload))
+        return len(events) == limit > 0
+
+    def _submit(self, url, events, payload):
+        token = events[0].claim_token
+        self._leases[token] += 1
+        self._outstanding[url] += 1
+        # A batch is dead-lettered by its most-retried event.
+        attempts = max(event.attempts for event in events)
+        callback = partial(self._on_result, url, [event.id for event in events], token, attempts)
+        self.dispatcher.submit(url, payload, callback=callback)
+
+    def _on_result(self, url, event_ids, claim_token, attempts, ok, error):
+        self._results.append((url, event_ids, claim_token, attempts, ok, error))
+        self._wake.set()
+
+    def _renew_leases(self):
+        # Rows can wait in the dispatcher queue longer than one lease; keep them ours until
+        # their result is recorded, so no other relay claims and sends them again.
+        if self._leases:
+            self.outbox_repo.renew(list(self._leases), self.lease_seconds)
+            self.outbox_repo.commit()
+
+    def _record_results(self):
+        delivered = []
+        now = utcnow()
+        while self._results:
+            url, event_ids, claim_token, attempts, ok, error = self._results.popleft()
+            for counter, key in ((self._leases, claim_token), (self._outstanding, url)):
+                counter[key] -= 1
+                if not counter[key]:
+                    del counter[key]
+            if ok:
+                delivered.extend((event_id, claim_token) for event_id in event_ids)
+                continue
+
+            attempts += 1
+            retry_at = None
+            if attempts >= self.max_attempts:
+                logger.error(f"Webhook outbox events {event_ids} dead-lettered after {attempts} attempts: {error}")
+            else:
+                retry_at = now + timedelta(seconds=self.backoff(attempts))
+            self.outbox_repo.mark_failed(event_ids, claim_token, error, next_attempt_at=retry_at)
+
+        if delivered:
+            self.outbox_repo.mark_delivered(delivered)
+        self.outbox_repo.commit()
+
+
+relay = OutboxRelay(dispatcher)
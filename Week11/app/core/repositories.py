@@ -1,16 +1,54 @@
-from app.models import Book, Webhook
+import json
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from datetime import timedelta
+from itertools import groupby
+from sqlalchemy import func, insert, select, tuple_, update
+from app.models import Book, Webhook, OutboxEvent, BOOK_COLUMNS, utcnow
 from app.extensions import db
 
 class BookRepository:
     def get_all(self):
         return Book.query.all()
 
-    def create(self, title, author):
+    def get_all_rows(self):
+        """Every book as a plain dict, selected column by column instead of as Book objects."""
+        result = db.session.execute(select(*BOOK_COLUMNS))
+        keys = tuple(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+    def iter_all(self, batch_size=1000):
+        """Yield every book as plain dicts, `batch_size` rows per list, without loading the table."""
+        result = db.session.execute(
+            select(*BOOK_COLUMNS)
+            .order_by(Book.id)
+            .execution_options(yield_per=batch_size)
+        )
+        return result.mappings().partitions()
+
+    def create(self, title, author, commit=True):
         book = Book(title=title, author=author)
         db.session.add(book)
-        db.session.commit()
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
         return book
 
+    def create_many(self, rows):
+        """Insert `rows` with one multi-row INSERT ... RETURNING, without committing.
+
+        Returned rows carry their own values, so their order doesn't matter; asking
+        for sort_by_parameter_order would make SQLite send one INSERT per row.
+        """
+        result = db.session.execute(insert(Book).returning(Book.id, Book.title, Book.author, Book.available), rows)
+        return [dict(row._mapping) for row in result]
+
+    def commit(self):
+        db.session.commit()
+
     def delete(self, book_id):
         book = Book.query.get(book_id)
         if book:
@@ -19,12 +57,235 @@ class BookRepository:
             return True
         return False
 
+Subscriber = namedtuple('Subscriber', ['id', 'url', 'delivery_mode'])
+
+class SubscriberIndex:
+    """Process-wide event_type -> subscribers map.
+
+    Writes through WebhookRepository invalidate the affected event type; the TTL
+    bounds staleness when another process changes the webhook table. A list loaded
+    while an invalidation happens is returned but not stored, so it can't put the
+    pre-write subscribers back for a whole TTL.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, event_type, loader):
+        with self._lock:
+            entry = self._entries.get(event_type)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            generation = self._generation
+
+        subscribers = tuple(loader(event_type))
+        with self._lock:
+            if generation == self._generation:
+                self._entries[event_type] = (time.monotonic() + self.ttl, subscribers)
+        return subscribers
+
+    def invalidate(self, event_type=None):
+        with self._lock:
+            self._generation += 1
+            if event_type is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(event_type, None)
+
+subscriber_index = SubscriberIndex()
+
 class WebhookRepository:
     def get_by_event(self, event_type):
-        return Webhook.query.filter_by(event_type=event_type).all()
+        return subscriber_index.get(event_type, self._load_subscribers)
+
+    def _load_subscribers(self, event_type):
+        rows = db.session.execute(
+            select(Webhook.id, Webhook.url, Webhook.delivery_mode)
+            .where(Webhook.event_type == event_type)
+            .order_by(Webhook.id)
+        )
+        return [Subscriber(*row) for row in rows]
 
-    def create(self, user_id, url, event_type):
-        webhook = Webhook(user_id=user_id, url=url, event_type=event_type)
+    def create(self, user_id, url, event_type, **delivery):
+        webhook = Webhook(user_id=user_id, url=url, event_type=event_type, **delivery)
         db.session.add(webhook)
         db.session.commit()
-        return webhook
\ No newline at end of file
+        subscriber_index.invalidate(event_type)
+        return webhook
+
+    def delete(self, webhook_id):
+        webhook = Webhook.query.get(webhook_id)
+        if webhook:
+            event_type = webhook.event_type
+            db.session.delete(webhook)
+            db.session.commit()
+            subscriber_index.invalidate(event_type)
+            return True
+        return False
+
+class OutboxRepository:
+    def stage(self, subscribers, event_type, payload):
+        """Add one outbox row per subscriber to the current transaction without committing."""
+        body = json.dumps(payload)
+        for sub in subscribers:
+            db.session.add(OutboxEvent(
+                webhook_id=sub.id, url=sub.url, event_type=event_type, payload=body,
+                batched=sub.delivery_mode == 'batch',
+            ))
+
+    def stage_many(self, subscribers, event_type, payloads):
+        """Like `stage` for many payloads at once, as a single executemany INSERT."""
+        rows = [
+            {"webhook_id": sub.id, "url": sub.url, "event_type": event_type,
+             "payload": json.dumps(payload), "batched": sub.delivery_mode == 'batch'}
+            for payload in payloads
+            for sub in subscribers
+        ]
+        if rows:
+            db.session.execute(insert(OutboxEvent), rows)
+
+    def claim(self, limit, lease_seconds, max_per_url, outstanding=None):
+        """Atomically lease up to `limit` due rows, at most `max_per_url` per subscriber URL.
+
+        `outstanding` maps URLs to rows this process already holds, which count against the
+        cap, so a subscriber with a backlog is skipped and can't crowd out the others.
+        Claimed rows stay `in_flight` with `next_attempt_at` pushed out by the lease, so rows
+        held by a crashed process become due again once the lease runs out.
+        """
+        now = utcnow()
+        outstanding = outstanding or {}
+        saturated = [url for url, held in outstanding.items() if held >= max_per_url]
+        position = func.row_number().over(partition_by=OutboxEvent.url, order_by=OutboxEvent.id)
+        due = (
+            select(OutboxEvent.id, OutboxEvent.url, position.label('position'))
+            .where(
+                OutboxEvent.status.in_(('pending', 'in_flight')),
+                OutboxEvent.next_attempt_at <= now,
+                OutboxEvent.batched.is_(False),
+                OutboxEvent.url.not_in(saturated),
+            )
+            .subquery()
+        )
+        rows = db.session.execute(
+            select(due.c.id, due.c.url).where(due.c.position <= max_per_url).order_by(due.c.id)
+        )
+        event_ids = []
+        taken = Counter()
+        for event_id, url in rows:
+            if outstanding.get(url, 0) + taken[url] < max_per_url:
+                taken[url] += 1
+                event_ids.append(event_id)
+                if len(event_ids) >= limit:
+                    break
+        if not event_ids:
+            return []
+
+        token = str(uuid.uuid4())
+        db.session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(event_ids), OutboxEvent.next_attempt_at <= now)
+            .values(status='in_flight', claim_token=token, next_attempt_at=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return OutboxEvent.query.filter_by(claim_token=token).order_by(OutboxEvent.id).all()
+
+    def claim_batches(self, limit, lease_seconds):
+        """Lease the next ready batch for up to `limit` batch-mode webhooks, as (url, events) pairs.
+
+        Only the oldest undelivered rows of a webhook are ever claimed and a webhook with a
+        batch still leased or backing off is skipped, so batches arrive in order. A batch is
+        ready once it is full, is being retried, or its oldest event has waited
+        `batch_window_ms`. Every webhook's head rows are read in one query and all ready
+        batches are leased with one UPDATE.
+        """
+        now = utcnow()
+        position = func.row_number().over(partition_by=OutboxEvent.webhook_id, order_by=OutboxEvent.id)
+        queued = (
+            select(OutboxEvent.id, position.label('position'))
+            .where(OutboxEvent.batched.is_(True), OutboxEvent.status.in_(('pending', 'in_flight')))
+            .subquery()
+        )
+        rows = (
+            db.session.query(OutboxEvent, Webhook)
+            .join(queued, queued.c.id == OutboxEvent.id)
+            .join(Webhook, Webhook.id == OutboxEvent.webhook_id)
+            .filter(Webhook.delivery_mode == 'batch', queued.c.position <= Webhook.batch_max_events)
+            .order_by(OutboxEvent.webhook_id, OutboxEvent.id)
+            .all()
+        )
+
+        ready = {}
+        for webhook, group in groupby(rows, key=lambda row: row[1]):
+            head = [event for event, _ in group]
+            if head[0].next_attempt_at > now:
+                continue
+            waited = now - head[0].created_at
+            if len(head) < webhook.batch_max_events and max(event.attempts for event in head) == 0 \
+                    and waited < timedelta(milliseconds=webhook.batch_window_ms):
+                continue
+            ready[webhook.id] = (webhook.url, [event.id for event in head])
+            if len(ready) >= limit:
+                break
+        if not ready:
+            return []
+
+        token = str(uuid.uuid4())
+        db.session.execute(
+            update(OutboxEvent)
+            .where(
+                OutboxEvent.id.in_([event_id for _, event_ids in ready.values() for event_id in event_ids]),
+                OutboxEvent.next_attempt_at <= now,
+            )
+            .values(status='in_flight', claim_token=token, next_attempt_at=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        claimed = OutboxEvent.query.filter_by(claim_token=token).order_by(OutboxEvent.webhook_id, OutboxEvent.id)
+        return [
+            (ready[webhook_id][0], list(events))
+            for webhook_id, events in groupby(claimed, key=lambda event: event.webhook_id)
+        ]
+
+    def renew(self, claim_tokens, lease_seconds):
+        """Push out the lease of rows still held under `claim_tokens`, e.g. while they wait in the dispatcher queue."""
+        db.session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.claim_token.in_(claim_tokens), OutboxEvent.status == 'in_flight')
+            .values(next_attempt_at=utcnow() + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+
+    def mark_delivered(self, claims):
+        """Mark `(event_id, claim_token)` pairs delivered; rows re-claimed under another token are left alone."""
+        db.session.execute(
+            update(OutboxEvent)
+            .where(tuple_(OutboxEvent.id, OutboxEvent.claim_token).in_(claims))
+            .values(status='delivered', delivered_at=utcnow(), claim_token=None, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    def mark_failed(self, event_ids, claim_token, error, next_attempt_at=None):
+        """Record a failed attempt; without `next_attempt_at` the rows are dead-lettered.
+
+        Only rows still held under `claim_token` are updated, so a late result can't
+        overwrite a row that another lease has since claimed.
+        """
+        db.session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(event_ids), OutboxEvent.claim_token == claim_token)
+            .values(
+                status='pending' if next_attempt_at else 'dead',
+                attempts=OutboxEvent.attempts + 1,
+                next_attempt_at=next_attempt_at or OutboxEvent.next_attempt_at,
+                claim_token=None,
+                last_error=(error or '')[:255],
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def commit(self):
+        db.session.commit()
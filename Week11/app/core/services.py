@@ -1,5 +1,6 @@
 from app.core.repositories import BookRepository, WebhookRepository
 from app.core.events import EventManager
+from app.core.cache import response_cache
 
 class BookService:
     def __init__(self):
@@ -7,23 +8,86 @@ class BookService:
         self.event_manager = EventManager()
 
     def get_books(self):
-        return [b.to_dict() for b in self.book_repo.get_all()]
+        return self.book_repo.get_all_rows()
+
+    def export_books(self, batch_size=1000):
+        return self.book_repo.iter_all(batch_size)
 
     def add_book(self, title, author):
-        new_book = self.book_repo.create(title, author)
-        
-        payload = {"event": "book_created", "data": new_book.to_dict()}
+        new_book = self.book_repo.create(title, author, commit=False).to_dict()
+
+        payload = {"event": "book_created", "data": new_book}
         self.event_manager.notify("book_created", payload)
-        
-        return new_book.to_dict()
+        self.book_repo.commit()
+        response_cache.invalidate('books')
+        self.event_manager.publish()
+
+        return new_book
+
+    def import_books(self, rows, chunk_size=1000, max_errors=100):
+        """Insert validated `(line, row, error)` rows in chunks, one transaction per chunk.
+
+        Each chunk commits its books together with their book_created outbox events, so
+        subscribers see exactly the books that were imported.
+        """
+        report = {"inserted": 0, "failed": 0, "errors": []}
+        chunk = []
+
+        def flush():
+            books = self.book_repo.create_many(chunk)
+            self.event_manager.notify_many("book_created", [{"event": "book_created", "data": b} for b in books])
+            self.book_repo.commit()
+            response_cache.invalidate('books')
+            self.event_manager.publish()
+            report["inserted"] += len(books)
+            chunk.clear()
+
+        for line, row, error in rows:
+            if error is None:
+                title, author = row.get('title'), row.get('author')
+                if isinstance(title, str) and isinstance(author, str) and title and author:
+                    chunk.append({"title": title, "author": author})
+                else:
+                    error = "title and author are required"
+            if error is not None:
+                report["failed"] += 1
+                if len(report["errors"]) < max_errors:
+                    report["errors"].append({"line": line, "error": error})
+                continue
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+        return report
 
     def delete_book(self, book_id):
-        return self.book_repo.delete(book_id)
+        deleted = self.book_repo.delete(book_id)
+        if deleted:
+            response_cache.invalidate('books', f'book:{book_id}')
+        return deleted
+
+def int_option(name, value, minimum):
+    """`value` if it is a whole number of at least `minimum`, else ValueError (a 400 for the caller)."""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be an integer")
+    if value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    return value
 
 class WebhookService:
     def __init__(self):
         self.webhook_repo = WebhookRepository()
 
-    def register_webhook(self, user_id, url, event_type):
-        webhook = self.webhook_repo.create(user_id, url, event_type)
+    def register_webhook(self, user_id, url, event_type, delivery_mode='single',
+                         batch_window_ms=None, batch_max_events=None):
+        if delivery_mode not in ('single', 'batch'):
+            raise ValueError("delivery_mode must be 'single' or 'batch'")
+
+        delivery = {"delivery_mode": delivery_mode}
+        if batch_window_ms is not None:
+            delivery["batch_window_ms"] = int_option("batch_window_ms", batch_window_ms, minimum=0)
+        if batch_max_events is not None:
+            delivery["batch_max_events"] = int_option("batch_max_events", batch_max_events, minimum=1)
+
+        webhook = self.webhook_repo.create(user_id, url, event_type, **delivery)
         return webhook.to_dict()
\ No newline at end of file
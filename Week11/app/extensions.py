@@ -1,13 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from app.core.ratelimit import rate_limit_key
 from prometheus_flask_exporter import PrometheusMetrics
 
 db = SQLAlchemy()
 
 jwt = JWTManager()
 
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=rate_limit_key)
 
 metrics = PrometheusMetrics.for_app_factory()
\ No newline at end of file
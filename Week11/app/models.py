@@ -1,6 +1,11 @@
+from datetime import datetime, timezone
 from app.extensions import db
 from werkzeug.security import generate_password_hash, check_password_hash
 
+def utcnow():
+    """Current UTC time, naive like the values the DateTime columns hand back."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -25,12 +30,43 @@ class Book(db.Model):
             "author": self.author,
             "available": self.available
         }
-    
+
+# The columns of Book.to_dict, for read-only listings that select plain rows
+# instead of hydrating Book objects.
+BOOK_COLUMNS = (Book.id, Book.title, Book.author, Book.available)
+
 class Webhook(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     url = db.Column(db.String(255), nullable=False)
-    event_type = db.Column(db.String(50), nullable=False)
+    event_type = db.Column(db.String(50), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    delivery_mode = db.Column(db.String(10), nullable=False, default='single')
+    batch_window_ms = db.Column(db.Integer, nullable=False, default=2000)
+    batch_max_events = db.Column(db.Integer, nullable=False, default=100)
 
     def to_dict(self):
-        return {"url": self.url, "event_type": self.event_type}
\ No newline at end of file
+        data = {"url": self.url, "event_type": self.event_type, "delivery_mode": self.delivery_mode}
+        if self.delivery_mode == 'batch':
+            data["batch_window_ms"] = self.batch_window_ms
+            data["batch_max_events"] = self.batch_max_events
+        return data
+
+class OutboxEvent(db.Model):
+    """One pending webhook delivery, written in the same commit as the change it announces."""
+    id = db.Column(db.Integer, primary_key=True)
+    webhook_id = db.Column(db.Integer, db.ForeignKey('webhook.id'), index=True)
+    url = db.Column(db.String(255), nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+    batched = db.Column(db.Boolean, nullable=False, default=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    claim_token = db.Column(db.String(36), index=True)
+    last_error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=utcnow)
+    delivered_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_outbox_event_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
@@ -0,0 +1,56 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+WEEK11 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def async_dispatcher_module(monkeypatch):
+    monkeypatch.syspath_prepend(WEEK11)
+    for name in [m for m in sys.modules if m == "app" or m.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+    from app.core import async_dispatcher
+    return async_dispatcher
+
+
+class NoContentHandler(BaseHTTPRequestHandler):
+    """Keep-alive receiver that answers every POST with a bodiless 204."""
+
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.connections.add(self.client_address)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def receiver():
+    NoContentHandler.connections = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), NoContentHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/hook"
+    server.shutdown()
+    server.server_close()
+
+
+def test_204_is_delivered_and_the_connection_reused(async_dispatcher_module, receiver):
+    dispatcher = async_dispatcher_module.AsyncWebhookDispatcher(max_per_host=1, timeout=2)
+    results = []
+    for i in range(3):
+        done = threading.Event()
+        dispatcher.submit(receiver, {"n": i}, callback=lambda ok, error: (results.append((ok, error)), done.set()))
+        assert done.wait(5)
+
+    assert results == [(True, None)] * 3
+    assert len(NoContentHandler.connections) == 1
@@ -1,5 +1,6 @@
 from flask import Flask, request, jsonify, make_response
-import hashlib, json
+import json
+import uuid
 
 app = Flask(__name__)
 
@@ -10,6 +11,13 @@ BOOKS = {
 }
 NEXT_ID = 3
 
+# Bumped on every write to BOOKS; ETags are built from it, so a conditional GET is
+# answered without serializing or hashing anything. BOOKS lives in this process only,
+# so the tags also carry a per-process epoch: after a restart, or from another worker,
+# an old tag never matches.
+BOOKS_VERSION = 1
+BOOKS_EPOCH = uuid.uuid4().hex[:12]
+
 # Helpers
 def success_response(data=None, message=None, status_code=200):
     return jsonify({"status": "success", "data": data, "message": message}), status_code
@@ -41,24 +49,23 @@ def require_bearer():
     return None
 
 # Cacheable
-def etag_for(obj) -> str:
-    body = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
-    return hashlib.sha256(body).hexdigest()
+def bump_books_version():
+    global BOOKS_VERSION
+    BOOKS_VERSION += 1
 
-def cacheable_json(data, max_age=60):
-    body = {"status": "success", "data": data, "message": None}
-    tag = etag_for(body)
-    inm = request.headers.get("If-None-Match")
+def books_etag(*parts):
+    return "-".join(["books", BOOKS_EPOCH, f"v{BOOKS_VERSION}", *map(str, parts)])
 
-    if inm and inm == tag:
+def cacheable_json(tag, load, max_age=60):
+    """304 if the client already has `tag`; otherwise call `load()` and serialize it once."""
+    if request.if_none_match.contains_weak(tag):
         resp = make_response("", 304)
-        resp.headers["ETag"] = tag
-        resp.headers["Cache-Control"] = f"public, max-age={max_age}"
-        return resp
-    
-    resp = make_response(json.dumps(body))
-    resp.headers["Content-Type"] = "application/json; charset=utf-8"
-    resp.headers["ETag"] = tag
+    else:
+        body = {"status": "success", "data": load(), "message": None}
+        resp = make_response(json.dumps(body))
+        resp.headers["Content-Type"] = "application/json; charset=utf-8"
+
+    resp.set_etag(tag)
     resp.headers["Cache-Control"] = f"public, max-age={max_age}"
 
     return resp
@@ -71,7 +78,7 @@ def v4_list_books():
     if err: 
         return err
     
-    return cacheable_json(list_books(), max_age=120)
+    return cacheable_json(books_etag(), list_books, max_age=120)
 
 @app.get("/api/v4/books/<int:book_id>")
 def v4_get_book(book_id: int):
@@ -83,7 +90,7 @@ def v4_get_book(book_id: int):
     if not b:
         return error_response("Book not found", 404)
     
-    return cacheable_json(b, max_age=180)
+    return cacheable_json(books_etag(book_id), lambda: b, max_age=180)
 
 @app.post("/api/v4/books")
 def v4_create_book():
@@ -101,6 +108,7 @@ def v4_create_book():
 
     BOOKS[NEXT_ID] = {"id": NEXT_ID, "title": data["title"], "author": data["author"], "available": True}
     created = BOOKS[NEXT_ID]; NEXT_ID += 1
+    bump_books_version()
 
     return success_response(created, "Book created", 201)
 
@@ -1,12 +1,117 @@
+from bisect import bisect_left, insort
+from itertools import count
+
 from flask import Flask, request, jsonify, make_response, url_for
 
 app = Flask(__name__)
 
+
+class BookStore:
+    """In-memory books: id -> record, plus indexes on author, category and year.
+
+    Lookups by id are O(1); filters start from the smallest matching index instead
+    of scanning every book. Ids come from a counter, so a deleted id is never reused.
+    """
+
+    def __init__(self, books=()):
+        self.by_id = {}
+        self.by_author = {}
+        self.by_category = {}
+        self.by_year = {}
+        self.years = []  # sorted keys of by_year, for min_year range lookups
+        for book in books:
+            self._index(book)
+        self._ids = count(max(self.by_id, default=0) + 1)
+
+    def get(self, book_id):
+        return self.by_id.get(book_id)
+
+    def create(self, **fields):
+        book = {"id": next(self._ids), **fields}
+        self._index(book)
+        return book
+
+    def replace(self, book_id, **fields):
+        if book_id not in self.by_id:
+            return None
+        self._unindex(self.by_id[book_id])
+        book = {"id": book_id, **fields}
+        self._index(book)
+        return book
+
+    def delete(self, book_id):
+        book = self.by_id.pop(book_id, None)
+        if book is None:
+            return False
+        self._unindex(book)
+        return True
+
+    def filter(self, author=None, category=None, min_year=None):
+        """Books matching every given filter, in id order."""
+        candidates = []
+        if author:
+            candidates.append(self.by_author.get(author, ()))
+        if category:
+            candidates.append(self.by_category.get(category, ()))
+        if min_year is not None:
+            years = self.years[bisect_left(self.years, min_year):]
+            candidates.append([book_id for year in years for book_id in self.by_year[year]])
+        if not candidates:
+            return list(self.by_id.values())
+
+        # Walk the smallest index and check the other filters on each record.
+        ids = min(candidates, key=len)
+        matches = [
+            b for b in map(self.by_id.__getitem__, ids)
+            if (not author or b.get("author") == author)
+            and (not category or b.get("category") == category)
+            and (min_year is None or self._year_key(b) is not None and b["year"] >= min_year)
+        ]
+        matches.sort(key=lambda b: b["id"])
+        return matches
+
+    @staticmethod
+    def _year_key(book):
+        year = book.get("year")
+        if isinstance(year, (int, float)) and not isinstance(year, bool) and year:
+            return year
+        return None
+
+    def _keys(self, book):
+        # Query-string filters are strings and years must compare, so other values stay unindexed.
+        author, category, year = book.get("author"), book.get("category"), self._year_key(book)
+        yield self.by_author, author if isinstance(author, str) else None
+        yield self.by_category, category if isinstance(category, str) else None
+        yield self.by_year, year
+
+    def _index(self, book):
+        self.by_id[book["id"]] = book
+        for index, value in self._keys(book):
+            if value is None:
+                continue
+            if value not in index:
+                index[value] = set()
+                if index is self.by_year:
+                    insort(self.years, value)
+            index[value].add(book["id"])
+
+    def _unindex(self, book):
+        for index, value in self._keys(book):
+            if value is None:
+                continue
+            ids = index[value]
+            ids.discard(book["id"])
+            if not ids:
+                del index[value]
+                if index is self.by_year:
+                    self.years.pop(bisect_left(self.years, value))
+
+
 # Sample data
-BOOKS = [
+BOOKS = BookStore([
     {"id": 1, "title": "1984", "author": "Orwell", "year": 1949, "category": "novel"},
     {"id": 2, "title": "Clean Code", "author": "Martin", "year": 2008, "category": "tech"},
-]
+])
 
 USERS = [
     {"id": 1, "name": "Alice"},
@@ -35,13 +140,7 @@ def list_books():
     min_year = request.args.get("min_year", type=int)
     sort = request.args.get("sort")
 
-    data = BOOKS
-    if author:
-        data = [b for b in data if b.get("author") == author]
-    if category:
-        data = [b for b in data if b.get("category") == category]
-    if min_year is not None:
-        data = [b for b in data if b.get("year") and b["year"] >= min_year]
+    data = BOOKS.filter(author=author, category=category, min_year=min_year)
 
     if sort:
         if sort not in ALLOWED_SORT:
@@ -64,22 +163,20 @@ def create_book():
     if not title or not author:
         return fail("title and author are required", 400)
 
-    new_id = (max(b["id"] for b in BOOKS) + 1) if BOOKS else 1
-    new = {"id": new_id, "title": title, "author": author, "year": year, "category": category}
-    BOOKS.append(new)
+    new = BOOKS.create(title=title, author=author, year=year, category=category)
 
     return ok(
         data=new,
         status=201,
-        location=url_for("get_book", book_id=new_id)
+        location=url_for("get_book", book_id=new["id"])
     )
 
 @app.get("/api/v1/books/<int:book_id>")
 def get_book(book_id: int):
-    for b in BOOKS:
-        if b["id"] == book_id:
-            return ok(data=b)
-    return fail("Book not found", 404)
+    book = BOOKS.get(book_id)
+    if book is None:
+        return fail("Book not found", 404)
+    return ok(data=book)
 
 @app.put("/api/v1/books/<int:book_id>")
 def update_book(book_id: int):
@@ -95,20 +192,16 @@ def update_book(book_id: int):
     if not title or not author:
         return fail("title and author are required", 400)
 
-    for i, b in enumerate(BOOKS):
-        if b["id"] == book_id:
-            BOOKS[i] = {"id": book_id, "title": title, "author": author, "year": year, "category": category}
-            return ok(data=BOOKS[i])
-
-    return fail("Book not found", 404)
+    book = BOOKS.replace(book_id, title=title, author=author, year=year, category=category)
+    if book is None:
+        return fail("Book not found", 404)
+    return ok(data=book)
 
 @app.delete("/api/v1/books/<int:book_id>")
 def delete_book(book_id: int):
-    for i, b in enumerate(BOOKS):
-        if b["id"] == book_id:
-            BOOKS.pop(i)
-            return ("", 204)
-    return fail("Book not found", 404)
+    if not BOOKS.delete(book_id):
+        return fail("Book not found", 404)
+    return ("", 204)
 
 @app.get("/api/v1/users/<int:user_id>")
 def get_user(user_id: int):
@@ -0,0 +1,74 @@
+"""Flask's default JSON provider vs FastJSONProvider on large list responses.
+
+    python Week5/bench/json_provider.py [rows] [runs]
+
+Times three providers on a throwaway SQLite file (or $DATABASE_URL):
+Flask's DefaultJSONProvider, FastJSONProvider on the stdlib (orjson hidden), and
+FastJSONProvider on orjson when it is installed (`pip install .[fast-json]`).
+Each is measured on GET /books?limit=N and on provider.response() for N dicts
+carrying a datetime, like borrow records.
+"""
+import datetime as dt
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+WEEK5 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/library.db")
+sys.path.insert(0, WEEK5)
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import json_provider  # noqa: E402
+from config import SessionLocal  # noqa: E402
+from main import app  # noqa: E402
+from models import Book  # noqa: E402
+from utils import response_cache  # noqa: E402
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(samples)
+
+
+def main(rows=10_000, runs=20):
+    with SessionLocal() as db:
+        db.execute(insert(Book), [{"name": f"Book {i}", "author": f"Author {i % 100}", "status": "free"} for i in range(rows)])
+        db.commit()
+    now = dt.datetime.now(dt.timezone.utc)
+    records = [{"id": i, "user_id": i % 50, "book_id": i, "status": "created", "borrowed_at": now} for i in range(rows)]
+    client = app.test_client()
+    orjson = json_provider.orjson
+
+    def endpoint():
+        response_cache.invalidate("books")
+        assert client.get(f"/api/v1/books?limit={rows}").status_code == 200
+
+    def dump_records():
+        with app.app_context():
+            app.json.response(records)
+
+    providers = [
+        ("Flask default", DefaultJSONProvider(app), None),
+        ("provider, stdlib", json_provider.FastJSONProvider(app), None),
+    ]
+    if orjson is not None:
+        providers.append(("provider, orjson", json_provider.FastJSONProvider(app), orjson))
+
+    print(f"mean of {runs} runs{'' if orjson else ' (orjson not installed)'}")
+    for name, provider, backend in providers:
+        app.json, json_provider.orjson = provider, backend
+        print(f"  {name:<18} GET /books?limit={rows} {timed(endpoint, runs):7.1f} ms"
+              f"   response({rows} records) {timed(dump_records, runs):7.1f} ms")
+    json_provider.orjson = orjson
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
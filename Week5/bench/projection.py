@@ -0,0 +1,66 @@
+"""ORM hydration vs column-projected rows for a 10k-row book page.
+
+    python Week5/bench/projection.py [rows] [runs]
+
+Seeds a throwaway SQLite file (or $DATABASE_URL) and times, per page:
+  - ORM objects: db.query(Book) + Book.to_dict, the old listing path
+  - projected rows: db.query(*BOOK_COLUMNS) + row_dicts, the current one
+  - GET /books?limit=N end to end, which uses projected rows
+Both query paths must produce identical dicts.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+WEEK5 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/library.db")
+sys.path.insert(0, WEEK5)
+
+from sqlalchemy import insert  # noqa: E402
+
+from config import SessionLocal  # noqa: E402
+from main import app  # noqa: E402
+from models import BOOK_COLUMNS, Book  # noqa: E402
+from utils import response_cache, row_dicts  # noqa: E402
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(samples)
+
+
+def main(rows=10_000, runs=20):
+    with SessionLocal() as db:
+        db.execute(insert(Book), [{"name": f"Book {i}", "author": f"Author {i % 100}", "status": "free"} for i in range(rows)])
+        db.commit()
+
+    def orm_objects():
+        with SessionLocal() as db:
+            return [book.to_dict() for book in db.query(Book).order_by(Book.id).limit(rows)]
+
+    def projected_rows():
+        with SessionLocal() as db:
+            return row_dicts(db.query(*BOOK_COLUMNS).order_by(Book.id).limit(rows).all())
+
+    assert orm_objects() == projected_rows()
+
+    client = app.test_client()
+
+    def endpoint():
+        response_cache.invalidate("books")
+        assert client.get(f"/api/v1/books?limit={rows}").status_code == 200
+
+    print(f"{rows}-row page, mean of {runs} runs")
+    print(f"  SELECT + dicts, ORM objects     {timed(orm_objects, runs):8.1f} ms")
+    print(f"  SELECT + dicts, projected rows  {timed(projected_rows, runs):8.1f} ms")
+    print(f"  GET /books?limit={rows}         {timed(endpoint, runs):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
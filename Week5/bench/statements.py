@@ -0,0 +1,54 @@
+"""SQL statements per write request, counted with a before_cursor_execute listener.
+
+    python Week5/bench/statements.py
+
+Runs against a throwaway SQLite file (or $DATABASE_URL). BEGIN/COMMIT are not
+cursor executes, so they are not counted. The script only talks HTTP, so running
+it on an older checkout gives the "before" column for comparison.
+"""
+import os
+import sys
+import tempfile
+
+WEEK5 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/library.db")
+sys.path.insert(0, WEEK5)
+
+from sqlalchemy import event  # noqa: E402
+
+from config import engine  # noqa: E402
+from main import app  # noqa: E402
+
+statements = []
+event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+
+
+def count(client, method, path, **kwargs):
+    statements.clear()
+    resp = client.open(path, method=method, **kwargs)
+    assert resp.status_code < 400, (path, resp.status_code, resp.get_data(as_text=True))
+    return resp, len(statements)
+
+
+def main():
+    client = app.test_client()
+    rows = []
+
+    resp, n = count(client, "POST", "/api/v1/users", json={"username": "bench", "password": "secret"})
+    user_id = resp.get_json()["id"]
+    rows.append(("create_user", n))
+    rows.append(("update_user", count(client, "PUT", f"/api/v1/users/{user_id}", json={"username": "bench2"})[1]))
+
+    resp, n = count(client, "POST", "/api/v1/books", json={"name": "Dune", "author": "Frank Herbert"})
+    book_id = resp.get_json()["id"]
+    rows.append(("create_book", n))
+    rows.append(("update_book", count(client, "PUT", f"/api/v1/books/{book_id}", json={"name": "Dune Messiah"})[1]))
+    rows.append(("create_borrow", count(client, "POST", "/api/v1/borrows", json={"user_id": user_id, "book_id": book_id})[1]))
+
+    print(f"{'Week5':<16}statements")
+    for name, n in rows:
+        print(f"  {name:<14}{n:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,95 @@
-from sqlalchemy import create_engine
+import os
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///library.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///library.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "100"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+def create_db_engine(url: str = DATABASE_URL):
+    """Engine with pool settings from the environment.
+
+    SQLite connections switch to WAL (readers no longer wait on the writer),
+    synchronous=NORMAL, a memory-mapped read window and a busy timeout instead
+    of failing at once with "database is locked".
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    engine = create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={"check_same_thread": False} if backend == "sqlite" else {},
+    )
+
+    if backend == "sqlite":
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_conn, _):
+            cursor = dbapi_conn.cursor()
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+            cursor.close()
+
+    return engine
+
+
+# Pool checkout metrics: how many connections requests hold and for how long.
+POOL_STATS = {"checkouts": 0, "checked_out": 0, "hold_seconds_total": 0.0, "hold_seconds_max": 0.0}
+_pool_stats_lock = threading.Lock()
+
+
+def track_pool_usage(engine):
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_conn, record, proxy):
+        record.info["checked_out_at"] = time.perf_counter()
+        with _pool_stats_lock:
+            POOL_STATS["checkouts"] += 1
+            POOL_STATS["checked_out"] += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_conn, record):
+        started = record.info.pop("checked_out_at", None)
+        if started is None:
+            return
+        held = time.perf_counter() - started
+        with _pool_stats_lock:
+            POOL_STATS["checked_out"] -= 1
+            POOL_STATS["hold_seconds_total"] += held
+            POOL_STATS["hold_seconds_max"] = max(POOL_STATS["hold_seconds_max"], held)
+
+
+def pool_stats() -> dict:
+    with _pool_stats_lock:
+        stats = dict(POOL_STATS)
+    stats["hold_seconds_avg"] = stats["hold_seconds_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+    return stats
+
+engine = create_db_engine()
+track_pool_usage(engine)
+# expire_on_commit=False: handlers serialize the rows they just wrote without a refresh SELECT.
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 Base = declarative_base()
@@ -1,18 +1,22 @@
 from flask import Flask, jsonify, send_from_directory
 from flask_swagger_ui import get_swaggerui_blueprint
-from config import Base, engine
+from config import Base, engine, pool_stats
 from router import api
+from utils import close_db, response_cache
+from json_provider import FastJSONProvider
 import os
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
     Base.metadata.create_all(bind=engine)
     app.register_blueprint(api, url_prefix="/api/v1")
+    app.teardown_request(close_db)
 
     @app.get("/api/v1/health")
     def health():
-        return jsonify({"status": "ok"})
+        return jsonify({"status": "ok", "db_pool": pool_stats(), "response_cache": response_cache.stats()})
 
     SWAGGER_URL = "/docs"
     API_URL = "/static/openapi.yaml"
@@ -23,6 +23,10 @@ class Book(Base):
     def to_dict(self):
         return {"id": self.id, "name": self.name, "author": self.author, "status": self.status}
 
+# The columns of Book.to_dict: read-only listings select these as plain rows
+# (utils.row_dicts turns them into the same dicts) instead of hydrating Book objects.
+BOOK_COLUMNS = (Book.id, Book.name, Book.author, Book.status)
+
 class BorrowRequest(Base):
     __tablename__ = "borrow_requests"
     id = Column(Integer, primary_key=True, index=True)
@@ -1,10 +1,15 @@
+from dataclasses import fields
 from flask import Blueprint, jsonify, request
-from sqlalchemy import select
-from config import SessionLocal
-from models import User, Book, BorrowRequest
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from models import User, Book, BorrowRequest, BOOK_COLUMNS
 from schemas import UserCreateSchema, UserUpdateSchema, BookCreateSchema, BookUpdateSchema, BorrowCreateSchema
 from exceptions import NotFoundError, BadRequestError, ConflictError
-from utils import get_json_or_400, paginate_query_offset_limit, parse_offset_limit
+from utils import (
+    get_db, get_json_or_400, paginate_query_offset_limit, parse_offset_limit,
+    encode_cursor, parse_cursor, paginate_query_keyset, wants_total, row_dicts, bulk_import,
+    response_cache, cached_response,
+)
 
 api = Blueprint("api", __name__)
 
@@ -26,12 +31,17 @@ def handle_conflict(e):
 def handle_value_error(e):
     return jsonify({"error": str(e)}), 400
 
-def db_session():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def book_page(query, offset, limit, after_id):
+    """Offset page by default; keyset page (no OFFSET, COUNT only on request) when a cursor is given."""
+    if after_id is None:
+        total, items = paginate_query_offset_limit(query, offset, limit)
+        next_cursor = encode_cursor(items[-1].id) if items and offset + len(items) < total else None
+        return {"total": total, "offset": offset, "limit": limit, "next_cursor": next_cursor, "items": row_dicts(items)}
+    items, next_cursor = paginate_query_keyset(query, Book.id, after_id, limit)
+    page = {"limit": limit, "next_cursor": next_cursor, "items": row_dicts(items)}
+    if wants_total():
+        page["total"] = query.count()
+    return page
 
 
 #----- User section -----
@@ -42,22 +52,23 @@ def create_user():
         payload = UserCreateSchema(**data)
     except TypeError:
         raise BadRequestError("username and password are required")
-    with next(db_session()) as db:
-        if db.scalar(select(User).where(User.username == payload.username)):
-            raise ConflictError("Username already exists")
-        user = User(username=payload.username, password=payload.password)
-        db.add(user)
+    db = get_db()
+    user = User(username=payload.username, password=payload.password)
+    db.add(user)
+    try:
         db.commit()
-        db.refresh(user)
-        return jsonify(user.to_dict()), 201
+    except IntegrityError:
+        db.rollback()
+        raise ConflictError("Username already exists")
+    return jsonify(user.to_dict()), 201
 
 @api.get("/users/<int:user_id>")
 def get_user(user_id: int):
-    with next(db_session()) as db:
-        user = db.get(User, user_id)
-        if not user:
-            raise NotFoundError("User not found")
-        return jsonify(user.to_dict())
+    db = get_db()
+    user = db.get(User, user_id)
+    if not user:
+        raise NotFoundError("User not found")
+    return jsonify(user.to_dict())
 
 @api.put("/users/<int:user_id>")
 def update_user(user_id: int):
@@ -66,33 +77,32 @@ def update_user(user_id: int):
         payload = UserUpdateSchema(**data)
     except TypeError:
         raise BadRequestError("Invalid fields")
-    with next(db_session()) as db:
-        user = db.get(User, user_id)
-
-        if not user:
-            raise NotFoundError("User not found")
-        
-        if payload.username is not None:
-            if db.scalar(select(User).where(User.username == payload.username, User.id != user_id)):
-                raise ConflictError("Username already exists")
-            user.username = payload.username
-
-        if payload.password is not None:
-            user.password = payload.password
-            
-        db.commit()
-        db.refresh(user)
-        return jsonify(user.to_dict())
+    db = get_db()
+    user = db.get(User, user_id)
+
+    if not user:
+        raise NotFoundError("User not found")
+
+    if payload.username is not None:
+        if db.scalar(select(User).where(User.username == payload.username, User.id != user_id)):
+            raise ConflictError("Username already exists")
+        user.username = payload.username
+
+    if payload.password is not None:
+        user.password = payload.password
+
+    db.commit()
+    return jsonify(user.to_dict())
 
 @api.delete("/users/<int:user_id>")
 def delete_user(user_id: int):
-    with next(db_session()) as db:
-        user = db.get(User, user_id)
-        if not user:
-            raise NotFoundError("User not found")
-        db.delete(user)
-        db.commit()
-        return jsonify({"deleted": True})
+    db = get_db()
+    user = db.get(User, user_id)
+    if not user:
+        raise NotFoundError("User not found")
+    db.delete(user)
+    db.commit()
+    return jsonify({"deleted": True})
 
 @api.post("/books")
 def create_book():
@@ -104,29 +114,54 @@ def create_book():
     status = payload.status if payload.status in {"free", "borrowed", None} else None
     if status is None:
         status = "free"
-    with next(db_session()) as db:
-        book = Book(name=payload.name, author=payload.author, status=status)
-        db.add(book)
-        db.commit()
-        db.refresh(book)
-        return jsonify(book.to_dict()), 201
+    db = get_db()
+    book = Book(name=payload.name, author=payload.author, status=status)
+    db.add(book)
+    db.commit()
+    response_cache.invalidate("books")
+    return jsonify(book.to_dict()), 201
+
+BOOK_CREATE_FIELDS = frozenset(f.name for f in fields(BookCreateSchema))
+
+@api.post("/books:bulk")
+def bulk_create_books():
+    """Import books from an NDJSON or CSV body; each row is validated like POST /books."""
+    def validate(row):
+        unknown = row.keys() - BOOK_CREATE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        try:
+            payload = BookCreateSchema(**row)
+        except TypeError:
+            raise ValueError("name and author are required")
+        if not all(isinstance(v, str) and v.strip() for v in (payload.name, payload.author)):
+            raise ValueError("name and author must be non-empty strings")
+        status = payload.status if payload.status in {"free", "borrowed"} else "free"
+        return {"name": payload.name, "author": payload.author, "status": status}
+
+    report = bulk_import(get_db(), Book, validate)
+    if report["inserted"]:
+        response_cache.invalidate("books")
+    return jsonify(report)
 
 @api.get("/books")
+@cached_response("books")
 def list_books():
     offset, limit = parse_offset_limit()
-    with next(db_session()) as db:
-        query = db.query(Book).order_by(Book.id.asc())
-        total, items = paginate_query_offset_limit(query, offset, limit)
-        return jsonify({"total": total, "offset": offset, "limit": limit, "items": [b.to_dict() for b in items]})
+    after_id = parse_cursor()
+    db = get_db()
+    query = db.query(*BOOK_COLUMNS).order_by(Book.id.asc())
+    return jsonify(book_page(query, offset, limit, after_id))
 
 
 @api.get("/books/<int:book_id>")
+@cached_response("book:{book_id}")
 def get_book(book_id: int):
-    with next(db_session()) as db:
-        book = db.get(Book, book_id)
-        if not book:
-            raise NotFoundError("Book not found")
-        return jsonify(book.to_dict())
+    db = get_db()
+    book = db.get(Book, book_id)
+    if not book:
+        raise NotFoundError("Book not found")
+    return jsonify(book.to_dict())
 
 @api.put("/books/<int:book_id>")
 def update_book(book_id: int):
@@ -135,42 +170,42 @@ def update_book(book_id: int):
         payload = BookUpdateSchema(**data)
     except TypeError:
         raise BadRequestError("Invalid fields")
-    with next(db_session()) as db:
+    if payload.status is not None and payload.status not in {"free", "borrowed"}:
+        raise BadRequestError("Invalid status")
+    changes = {k: v for k, v in (("name", payload.name), ("author", payload.author), ("status", payload.status)) if v is not None}
+    db = get_db()
+    if changes:
+        book = db.scalar(update(Book).where(Book.id == book_id).values(**changes).returning(Book))
+    else:
         book = db.get(Book, book_id)
-        if not book:
-            raise NotFoundError("Book not found")
-        if payload.name is not None:
-            book.name = payload.name
-        if payload.author is not None:
-            book.author = payload.author
-        if payload.status is not None:
-            if payload.status not in {"free", "borrowed"}:
-                raise BadRequestError("Invalid status")
-            book.status = payload.status
-        db.commit()
-        db.refresh(book)
-        return jsonify(book.to_dict())
+    if not book:
+        raise NotFoundError("Book not found")
+    db.commit()
+    response_cache.invalidate("books", f"book:{book_id}")
+    return jsonify(book.to_dict())
 
 @api.delete("/books/<int:book_id>")
 def delete_book(book_id: int):
-    with next(db_session()) as db:
-        book = db.get(Book, book_id)
-        if not book:
-            raise NotFoundError("Book not found")
-        db.delete(book)
-        db.commit()
-        return jsonify({"deleted": True})
+    db = get_db()
+    book = db.get(Book, book_id)
+    if not book:
+        raise NotFoundError("Book not found")
+    db.delete(book)
+    db.commit()
+    response_cache.invalidate("books", f"book:{book_id}")
+    return jsonify({"deleted": True})
 
 @api.get("/books/search")
+@cached_response("books")
 def search_books():
     q = request.args.get("q", "", type=str).strip()
     if not q:
         raise BadRequestError("q is required")
     offset, limit = parse_offset_limit()
-    with next(db_session()) as db:
-        query = db.query(Book).filter((Book.name == q) | (Book.author == q)).order_by(Book.id.asc())
-        total, items = paginate_query_offset_limit(query, offset, limit)
-        return jsonify({"total": total, "offset": offset, "limit": limit, "items": [b.to_dict() for b in items]})
+    after_id = parse_cursor()
+    db = get_db()
+    query = db.query(*BOOK_COLUMNS).filter((Book.name == q) | (Book.author == q)).order_by(Book.id.asc())
+    return jsonify(book_page(query, offset, limit, after_id))
 
 @api.post("/borrows")
 def create_borrow():
@@ -179,19 +214,21 @@ def create_borrow():
         payload = BorrowCreateSchema(**data)
     except TypeError:
         raise BadRequestError("user_id and book_id are required")
-    with next(db_session()) as db:
-        user = db.get(User, payload.user_id)
-        if not user:
-            raise NotFoundError("User not found")
-        book = db.get(Book, payload.book_id)
-        if not book:
-            raise NotFoundError("Book not found")
-        if book.status != "free":
-            raise ConflictError("Book is not available")
-        borrow = BorrowRequest(user_id=user.id, book_id=book.id, status="created")
-        book.status = "borrowed"
-        db.add(borrow)
-        db.commit()
-        db.refresh(borrow)
-        db.refresh(book)
-        return jsonify({"borrow": borrow.to_dict(), "book": book.to_dict()}), 201
+    db = get_db()
+    if not db.get(User, payload.user_id):
+        raise NotFoundError("User not found")
+    book = db.get(Book, payload.book_id)
+    if not book:
+        raise NotFoundError("Book not found")
+    if book.status != "free":
+        raise ConflictError("Book is not available")
+    # The read above is only a fast path; this conditional UPDATE is what stops
+    # two concurrent borrowers from both taking the book.
+    if db.execute(update(Book).where(Book.id == book.id, Book.status == "free").values(status="borrowed")).rowcount != 1:
+        db.rollback()
+        raise ConflictError("Book is not available")
+    borrow = BorrowRequest(user_id=payload.user_id, book_id=book.id, status="created")
+    db.add(borrow)
+    db.commit()
+    response_cache.invalidate("books", f"book:{book.id}")
+    return jsonify({"borrow": borrow.to_dict(), "book": book.to_dict()}), 201
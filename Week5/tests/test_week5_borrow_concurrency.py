@@ -0,0 +1,52 @@
+import importlib
+import os
+import sys
+import threading
+
+import pytest
+
+WEEK5 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Flat modules that other weeks also define; purge them so this week's are imported.
+MODULES = ("config", "utils", "models", "router", "main", "cache", "json_provider", "schemas", "exceptions")
+
+
+@pytest.fixture
+def week5(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'library.db'}")
+    monkeypatch.syspath_prepend(WEEK5)
+    for name in MODULES:
+        sys.modules.pop(name, None)
+    main = importlib.import_module("main")
+    yield main, sys.modules["config"], sys.modules["models"]
+    for name in MODULES:
+        sys.modules.pop(name, None)
+
+
+def test_concurrent_borrows_take_the_book_once(week5):
+    main, config, models = week5
+    threads = 12
+    with config.SessionLocal() as db:
+        db.add_all(models.User(username=f"user{i}", password="x") for i in range(threads))
+        db.add(models.Book(name="Dune", author="Frank Herbert"))
+        db.commit()
+        book_id = db.query(models.Book.id).scalar()
+        user_ids = [u.id for u in db.query(models.User).order_by(models.User.id)]
+
+    barrier = threading.Barrier(threads)
+    statuses = [None] * threads
+
+    def borrow(i):
+        client = main.app.test_client()
+        barrier.wait()
+        statuses[i] = client.post("/api/v1/borrows", json={"user_id": user_ids[i], "book_id": book_id}).status_code
+
+    workers = [threading.Thread(target=borrow, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sorted(statuses) == [201] + [409] * (threads - 1)
+    with config.SessionLocal() as db:
+        assert db.query(models.BorrowRequest).count() == 1
+        assert db.get(models.Book, book_id).status == "borrowed"
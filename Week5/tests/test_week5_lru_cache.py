@@ -0,0 +1,35 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+WEEK5 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def cache_module(monkeypatch):
+    monkeypatch.syspath_prepend(WEEK5)
+    sys.modules.pop("cache", None)
+    yield importlib.import_module("cache")
+    sys.modules.pop("cache", None)
+
+
+def test_entry_larger_than_max_bytes_is_not_stored(cache_module):
+    cache = cache_module.LRUCache(maxsize=10, max_bytes=100)
+    cache.set("a", "small", size=40)
+    cache.set("b", "small", size=40)
+    cache.set("c", "huge", size=101)
+
+    assert cache.get("c") is None
+    assert cache.get("a") == "small" and cache.get("b") == "small"
+    assert cache.stats()["bytes"] == 80
+
+
+def test_oversized_overwrite_drops_the_old_value(cache_module):
+    cache = cache_module.LRUCache(maxsize=10, max_bytes=100)
+    cache.set("a", "old", size=40)
+    cache.set("a", "new", size=101)
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
@@ -1,4 +1,28 @@
-from flask import request
+import base64
+import csv
+import io
+import json
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+from sqlalchemy import insert
+
+from cache import ResponseCache
+from config import (
+    SessionLocal, BULK_CHUNK_SIZE, BULK_MAX_ERRORS,
+    RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_BYTES,
+)
+
+def get_db():
+    """Session for the current request, shared by auth and the handler; closed on teardown."""
+    if "db" not in g:
+        g.db = SessionLocal()
+    return g.db
+
+def close_db(exc=None):
+    db = g.pop("db", None)
+    if db is not None:
+        db.close()
 
 def get_json_or_400():
     data = request.get_json(silent=True)
@@ -20,3 +44,140 @@ def parse_offset_limit():
     offset = 0 if offset < 0 else offset
     limit = 1 if limit < 1 else limit
     return offset, limit
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        kind, value = raw.split(":", 1)
+        if kind != "id":
+            raise ValueError
+        return int(value)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+def parse_cursor():
+    """Return the id to seek after, or None when the request uses offset pagination."""
+    cursor = request.args.get("cursor")
+    if cursor:
+        return decode_cursor(cursor)
+    after_id = request.args.get("after_id")
+    if after_id is None:
+        return None
+    try:
+        return int(after_id)
+    except ValueError:
+        raise ValueError("Invalid after_id")
+
+def paginate_query_keyset(query, id_column, after_id, limit):
+    """Seek past `after_id` on an id-ordered query; page N costs the same as page 1."""
+    items = query.filter(id_column > after_id).limit(limit + 1).all()
+    next_cursor = encode_cursor(items[limit - 1].id) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+def row_dicts(rows):
+    """Dicts for rows of a column-projected query; zips the shared keys, cheaper than Row._asdict()."""
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+def wants_total():
+    return request.args.get("include_total", "").lower() in {"1", "true", "yes"}
+
+response_cache = ResponseCache(
+    maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS, max_bytes=RESPONSE_CACHE_MAX_BYTES
+)
+
+def cached_response(*tags):
+    """Serve a GET view from `response_cache`, keyed by path and query string.
+
+    `tags` name what the body depends on and may use the view's arguments, e.g.
+    "book:{book_id}"; writes call `response_cache.invalidate` with the same tags.
+    Only 200 responses are stored. Cached views must return the same body to every
+    caller, so they sit behind the auth check rather than varying by user.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            base = (request.path, tuple(sorted(request.args.items(multi=True))))
+            key = response_cache.key(base, [tag.format(**kwargs) for tag in tags])
+            cached = response_cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                return current_app.response_class(body, mimetype=mimetype)
+            resp = make_response(fn(*args, **kwargs))
+            if resp.status_code == 200 and not resp.is_streamed:
+                body = resp.get_data()
+                response_cache.set(key, (body, resp.mimetype), size=len(body))
+            return resp
+        return wrapper
+    return decorator
+
+BULK_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+def iter_bulk_rows():
+    """Yield (line, row, error) from an NDJSON or CSV request body, one line at a time."""
+    fmt = BULK_FORMATS.get(request.mimetype)
+    if fmt is None:
+        raise ValueError("Content-Type must be application/x-ndjson or text/csv")
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="" if fmt == "csv" else None)
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, "Too many columns"
+            else:
+                yield reader.line_num, {k: v for k, v in row.items() if v not in ("", None)}, None
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            yield line, None, "Invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield line, None, "Row must be a JSON object"
+            continue
+        yield line, row, None
+
+def bulk_import(db, model, validate):
+    """Stream the request body into `model` with one executemany INSERT and commit per chunk.
+
+    `validate(row)` returns the column values for a row or raises ValueError; rejected
+    rows are counted and the first BULK_MAX_ERRORS are reported by line number.
+    """
+    report = {"inserted": 0, "failed": 0, "errors": []}
+    chunk = []
+
+    def flush():
+        db.execute(insert(model), chunk)
+        db.commit()
+        report["inserted"] += len(chunk)
+        chunk.clear()
+
+    for line, row, error in iter_bulk_rows():
+        if error is None:
+            try:
+                chunk.append(validate(row))
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            report["failed"] += 1
+            if len(report["errors"]) < BULK_MAX_ERRORS:
+                report["errors"].append({"line": line, "error": error})
+            continue
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+    return report
@@ -0,0 +1,59 @@
+"""SQL statements per write request, counted with a before_cursor_execute listener.
+
+    python Week6/bench/statements.py
+
+Runs against a throwaway SQLite file (or $DATABASE_URL). BEGIN/COMMIT are not
+cursor executes, so they are not counted. The current user is resolved once before
+counting, so each figure is the handler's own statements. The script only talks
+HTTP, so running it on an older checkout gives the "before" column for comparison.
+"""
+import datetime as dt
+import os
+import sys
+import tempfile
+
+WEEK6 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/library.db")
+sys.path.insert(0, WEEK6)
+
+import jwt  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from config import ALGORITHM, SECRET_KEY, engine  # noqa: E402
+from main import app  # noqa: E402
+
+statements = []
+event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+
+
+def count(client, method, path, **kwargs):
+    statements.clear()
+    resp = client.open(path, method=method, **kwargs)
+    assert resp.status_code < 400, (path, resp.status_code, resp.get_data(as_text=True))
+    return resp, len(statements)
+
+
+def main():
+    client = app.test_client()
+    rows = []
+
+    rows.append(("register", count(client, "POST", "/api/v1/auth/register", json={"username": "bench", "password": "secret"})[1]))
+    exp = dt.datetime.now(dt.timezone.utc) + dt.timedelta(minutes=5)
+    token = jwt.encode({"sub": "bench", "exp": exp}, SECRET_KEY, algorithm=ALGORITHM)
+    headers = {"Authorization": f"Bearer {token}"}
+    count(client, "GET", "/api/v1/users/me", headers=headers)
+
+    resp, n = count(client, "POST", "/api/v1/books", json={"name": "Dune", "author": "Frank Herbert"}, headers=headers)
+    book_id = resp.get_json()["id"]
+    rows.append(("create_book", n))
+    rows.append(("update_book", count(client, "PUT", f"/api/v1/books/{book_id}", json={"name": "Dune Messiah"}, headers=headers)[1]))
+    rows.append(("borrow_book", count(client, "POST", f"/api/v1/books/{book_id}/borrow", headers=headers)[1]))
+    rows.append(("return_book", count(client, "POST", f"/api/v1/books/{book_id}/return", headers=headers)[1]))
+
+    print(f"{'Week6':<16}statements")
+    for name, n in rows:
+        print(f"  {name:<14}{n:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU map with a per-entry TTL and hit/miss counters.
+
+    With `max_bytes` set, entries are also evicted once the sizes passed to `set`
+    add up to more than that budget; an entry larger than the whole budget is not stored.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60, max_bytes: int | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float | None = None, size: int = 0):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Storing it would evict everything else and then the entry itself.
+                return
+            self._data[key] = (expires_at, value, size)
+            self._bytes += size
+            while self._data and (
+                len(self._data) > self.maxsize
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                self._remove(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, key):
+        _, value, size = self._data.pop(key)
+        self._bytes -= size
+        return value
+
+
+class ResponseCache:
+    """Response bodies for GET views, invalidated by tag.
+
+    Every key embeds the current generation of the tags it depends on ("books" for
+    listings, "book:7" for one book); `invalidate` bumps those generations so older
+    entries stop matching and age out of the LRU without a scan. Take the key before
+    running the view: a response computed while a write commits is then stored under
+    the old generation and never served.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30, max_bytes: int | None = None, max_tags: int = 100_000):
+        self.entries = LRUCache(maxsize=maxsize, ttl=ttl, max_bytes=max_bytes)
+        self.max_tags = max_tags
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def key(self, base, tags) -> tuple:
+        with self._lock:
+            return (self._epoch, base, tuple(self._generations.get(tag, 0) for tag in tags))
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, size: int = 0):
+        self.entries.set(key, value, size=size)
+
+    def invalidate(self, *tags):
+        with self._lock:
+            if len(self._generations) >= self.max_tags:
+                # Forget per-tag generations rather than grow forever; the new epoch misses everything.
+                self._generations.clear()
+                self._epoch += 1
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def stats(self) -> dict:
+        stats = self.entries.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -3,8 +3,11 @@ from pathlib import Path
 
 from flask import Flask, jsonify, send_from_directory
 from flask_swagger_ui import get_swaggerui_blueprint
-from config import Base, engine
+from config import Base, engine, pool_stats
 from router import api
+from utils import close_db, response_cache
+from search import ensure_search_index
+from json_provider import FastJSONProvider
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -16,16 +19,19 @@ def create_app():
         static_folder=str(BASE_DIR / "static"),
         static_url_path="/static",
     )
+    app.json = FastJSONProvider(app)
 
     # Tạo bảng
     Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
 
     # API
     app.register_blueprint(api, url_prefix="/api/v1")
+    app.teardown_request(close_db)
 
     @app.get("/api/v1/health")
     def health():
-        return jsonify({"status": "ok"})
+        return jsonify({"status": "ok", "db_pool": pool_stats(), "response_cache": response_cache.stats()})
 
     # Swagger UI
     SWAGGER_URL = "/docs"
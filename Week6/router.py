@@ -1,15 +1,19 @@
+from dataclasses import fields
 from flask import Blueprint, jsonify, request
-from sqlalchemy import select
-from config import SessionLocal
-from models import User, Book, BorrowRequest
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from models import User, Book, BorrowRequest, BOOK_COLUMNS
 from schemas import (
     RegisterSchema, LoginSchema, TokenResponse,
     UserCreateSchema, UserUpdateSchema,
     BookCreateSchema, BookUpdateSchema, BorrowCreateSchema
 )
+from search import fts_enabled, search_books_query
 from exceptions import NotFoundError, BadRequestError, ConflictError, UnauthorizedError, ForbiddenError
 from utils import (
-    get_json_or_400, paginate_query_offset_limit, parse_offset_limit,
+    get_db, get_json_or_400, paginate_query_offset_limit, parse_offset_limit,
+    encode_cursor, parse_cursor, paginate_query_keyset, wants_total, row_dicts, cached_count, count_cache, bulk_import,
+    response_cache, cached_response,
     hash_password, verify_password, create_access_token,
     login_required, get_current_user
 )
@@ -35,12 +39,22 @@ def handle_forbidden(e): return jsonify({"error": e.message}), e.status_code
 @api.errorhandler(ValueError)
 def handle_value_error(e): return jsonify({"error": str(e)}), 400
 
-def db_session():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def book_page(query, offset, limit, after_id, count_key, id_ordered=True):
+    """Offset page by default; keyset page (no OFFSET, cached COUNT on request) when a cursor is given.
+
+    Cursors continue by id, so an offset page ordered some other way (`id_ordered=False`,
+    e.g. by search rank) gets no next_cursor.
+    """
+    if after_id is None:
+        total, items = paginate_query_offset_limit(query, offset, limit)
+        has_more = offset + len(items) < total
+        next_cursor = encode_cursor(items[-1].id) if id_ordered and items and has_more else None
+        return {"total": total, "offset": offset, "limit": limit, "next_cursor": next_cursor, "items": row_dicts(items)}
+    items, next_cursor = paginate_query_keyset(query, Book.id, after_id, limit)
+    page = {"limit": limit, "next_cursor": next_cursor, "items": row_dicts(items)}
+    if wants_total():
+        page["total"] = cached_count(count_key, query)
+    return page
 
 # ========== Auth (OAuth2 Password) ==========
 @api.post("/auth/register")
@@ -50,14 +64,15 @@ def register():
         payload = RegisterSchema(**data)
     except TypeError:
         raise BadRequestError("username and password are required")
-    with next(db_session()) as db:
-        if db.scalar(select(User).where(User.username == payload.username)):
-            raise ConflictError("Username already exists")
-        user = User(username=payload.username, password=hash_password(payload.password))
-        db.add(user)
+    db = get_db()
+    user = User(username=payload.username, password=hash_password(payload.password))
+    db.add(user)
+    try:
         db.commit()
-        db.refresh(user)
-        return jsonify(user.to_dict()), 201
+    except IntegrityError:
+        db.rollback()
+        raise ConflictError("Username already exists")
+    return jsonify(user.to_dict()), 201
 
 @api.post("/auth/login")
 def login():
@@ -70,12 +85,12 @@ def login():
         payload = LoginSchema(**data)
     except TypeError:
         raise BadRequestError("username and password are required")
-    with next(db_session()) as db:
-        user = db.scalar(select(User).where(User.username == payload.username))
-        if not user or not verify_password(payload.password, user.password):
-            raise UnauthorizedError("Invalid credentials")
-        token = create_access_token(sub=user.username)
-        return jsonify(TokenResponse(access_token=token).__dict__)
+    db = get_db()
+    user = db.scalar(select(User).where(User.username == payload.username))
+    if not user or not verify_password(payload.password, user.password):
+        raise UnauthorizedError("Invalid credentials")
+    token = create_access_token(sub=user.username)
+    return jsonify(TokenResponse(access_token=token).__dict__)
 
 # ========== User ==========
 @api.get("/users/me")
@@ -96,30 +111,57 @@ def create_book():
     status = payload.status if payload.status in {"free", "borrowed", None} else None
     if status is None:
         status = "free"
-    with next(db_session()) as db:
-        book = Book(name=payload.name, author=payload.author, status=status)
-        db.add(book)
-        db.commit()
-        db.refresh(book)
-        return jsonify(book.to_dict()), 201
+    db = get_db()
+    book = Book(name=payload.name, author=payload.author, status=status)
+    db.add(book)
+    db.commit()
+    response_cache.invalidate("books")
+    return jsonify(book.to_dict()), 201
+
+BOOK_CREATE_FIELDS = frozenset(f.name for f in fields(BookCreateSchema))
+
+@api.post("/books:bulk")
+@login_required
+def bulk_create_books():
+    """Import books from an NDJSON or CSV body; each row is validated like POST /books."""
+    def validate(row):
+        unknown = row.keys() - BOOK_CREATE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        try:
+            payload = BookCreateSchema(**row)
+        except TypeError:
+            raise ValueError("name and author are required")
+        if not all(isinstance(v, str) and v.strip() for v in (payload.name, payload.author)):
+            raise ValueError("name and author must be non-empty strings")
+        status = payload.status if payload.status in {"free", "borrowed"} else "free"
+        return {"name": payload.name, "author": payload.author, "status": status}
+
+    report = bulk_import(get_db(), Book, validate)
+    if report["inserted"]:
+        count_cache.clear()
+        response_cache.invalidate("books")
+    return jsonify(report)
 
 @api.get("/books")
 @login_required
+@cached_response("books")
 def list_books():
     offset, limit = parse_offset_limit()
-    with next(db_session()) as db:
-        query = db.query(Book).order_by(Book.id.asc())
-        total, items = paginate_query_offset_limit(query, offset, limit)
-        return jsonify({"total": total, "offset": offset, "limit": limit, "items": [b.to_dict() for b in items]})
+    after_id = parse_cursor()
+    db = get_db()
+    query = db.query(*BOOK_COLUMNS).order_by(Book.id.asc())
+    return jsonify(book_page(query, offset, limit, after_id, ("books",)))
 
 @api.get("/books/<int:book_id>")
 @login_required
+@cached_response("book:{book_id}")
 def get_book(book_id: int):
-    with next(db_session()) as db:
-        book = db.get(Book, book_id)
-        if not book:
-            raise NotFoundError("Book not found")
-        return jsonify(book.to_dict())
+    db = get_db()
+    book = db.get(Book, book_id)
+    if not book:
+        raise NotFoundError("Book not found")
+    return jsonify(book.to_dict())
 
 @api.put("/books/<int:book_id>")
 @login_required
@@ -129,83 +171,99 @@ def update_book(book_id: int):
         payload = BookUpdateSchema(**data)
     except TypeError:
         raise BadRequestError("Invalid fields")
-    with next(db_session()) as db:
+    if payload.status is not None and payload.status not in {"free", "borrowed"}:
+        raise BadRequestError("Invalid status")
+    changes = {k: v for k, v in (("name", payload.name), ("author", payload.author)) if v is not None}
+    db = get_db()
+    book = None
+    if changes:
+        # status may only be echoed back unchanged, so it goes in the WHERE clause
+        stmt = update(Book).where(Book.id == book_id).values(**changes).returning(Book)
+        if payload.status is not None:
+            stmt = stmt.where(Book.status == payload.status)
+        book = db.scalar(stmt)
+    if not book:
         book = db.get(Book, book_id)
         if not book:
             raise NotFoundError("Book not found")
-        if payload.name is not None:
-            book.name = payload.name
-        if payload.author is not None:
-            book.author = payload.author
-        if payload.status is not None:
-            if payload.status not in {"free", "borrowed"}:
-                raise BadRequestError("Invalid status")
-            if book.status != payload.status:
-                raise BadRequestError("Use borrow/return endpoints to change status")
-        db.commit()
-        db.refresh(book)
-        return jsonify(book.to_dict())
+        if payload.status is not None and book.status != payload.status:
+            raise BadRequestError("Use borrow/return endpoints to change status")
+    db.commit()
+    response_cache.invalidate("books", f"book:{book_id}")
+    return jsonify(book.to_dict())
 
 @api.delete("/books/<int:book_id>")
 @login_required
 def delete_book(book_id: int):
-    with next(db_session()) as db:
-        book = db.get(Book, book_id)
-        if not book:
-            raise NotFoundError("Book not found")
-        db.delete(book)
-        db.commit()
-        return jsonify({"deleted": True})
+    db = get_db()
+    book = db.get(Book, book_id)
+    if not book:
+        raise NotFoundError("Book not found")
+    db.delete(book)
+    db.commit()
+    response_cache.invalidate("books", f"book:{book_id}")
+    return jsonify({"deleted": True})
 
 @api.get("/books/search")
 @login_required
+@cached_response("books")
 def search_books():
     q = request.args.get("q", "", type=str).strip()
     if not q:
         raise BadRequestError("q is required")
     offset, limit = parse_offset_limit()
-    with next(db_session()) as db:
-        query = db.query(Book).filter((Book.name.like(f"%{q}%")) | (Book.author.like(f"%{q}%"))).order_by(Book.id.asc())
-        total, items = paginate_query_offset_limit(query, offset, limit)
-        return jsonify({"total": total, "offset": offset, "limit": limit, "items": [b.to_dict() for b in items]})
+    after_id = parse_cursor()
+    db = get_db()
+    keyset = after_id is not None
+    query = search_books_query(db, q, keyset=keyset)
+    ranked = not keyset and fts_enabled(db.get_bind())
+    return jsonify(book_page(query, offset, limit, after_id, ("search", q), id_ordered=not ranked))
 
 @api.post("/books/<int:book_id>/borrow")
 @login_required
 def borrow_book(book_id: int):
     user = get_current_user()
-    with next(db_session()) as db:
-        book = db.get(Book, book_id)
-        if not book:
-            raise NotFoundError("Book not found")
-        if book.status != "free":
-            raise ConflictError("Book is not available")
-        borrow = BorrowRequest(user_id=user.id, book_id=book.id, status="created")
-        book.status = "borrowed"
-        db.add(borrow)
-        db.commit()
-        db.refresh(borrow)
-        db.refresh(book)
-        return jsonify({"borrow": borrow.to_dict(), "book": book.to_dict()}), 201
+    db = get_db()
+    book = db.get(Book, book_id)
+    if not book:
+        raise NotFoundError("Book not found")
+    if book.status != "free":
+        raise ConflictError("Book is not available")
+    # The read above is only a fast path; this conditional UPDATE is what stops
+    # two concurrent borrowers from both taking the book.
+    if db.execute(update(Book).where(Book.id == book.id, Book.status == "free").values(status="borrowed")).rowcount != 1:
+        db.rollback()
+        raise ConflictError("Book is not available")
+    borrow = BorrowRequest(user_id=user.id, book_id=book.id, status="created")
+    db.add(borrow)
+    db.commit()
+    response_cache.invalidate("books", f"book:{book.id}")
+    return jsonify({"borrow": borrow.to_dict(), "book": book.to_dict()}), 201
 
 @api.post("/books/<int:book_id>/return")
 @login_required
 def return_book(book_id: int):
     user = get_current_user()
-    with next(db_session()) as db:
-        book = db.get(Book, book_id)
-        if not book:
-            raise NotFoundError("Book not found")
-        if book.status != "borrowed":
-            raise ConflictError("Book is not borrowed")
-        br = (
-            db.query(BorrowRequest)
-            .filter(BorrowRequest.book_id == book.id, BorrowRequest.status == "created")
-            .order_by(BorrowRequest.id.desc())
-            .first()
-        )
-        if br:
-            br.status = "returned"
-        book.status = "free"
-        db.commit()
-        db.refresh(book)
-        return jsonify({"book": book.to_dict(), "borrow_status": br.status if br else "no_record"})
+    db = get_db()
+    book = db.get(Book, book_id)
+    if not book:
+        raise NotFoundError("Book not found")
+    if book.status != "borrowed":
+        raise ConflictError("Book is not borrowed")
+    if db.execute(update(Book).where(Book.id == book.id, Book.status == "borrowed").values(status="free")).rowcount != 1:
+        db.rollback()
+        raise ConflictError("Book is not borrowed")
+    latest = (
+        select(func.max(BorrowRequest.id))
+        .where(BorrowRequest.book_id == book_id, BorrowRequest.status == "created")
+        .scalar_subquery()
+    )
+    returned = db.scalar(
+        update(BorrowRequest)
+        .where(BorrowRequest.id == latest)
+        .values(status="returned")
+        .returning(BorrowRequest.id)
+    )
+    db.commit()
+    response_cache.invalidate("books", f"book:{book_id}")
+    return jsonify({"book": book.to_dict(), "borrow_status": "returned" if returned else "no_record"})
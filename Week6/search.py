@@ -0,0 +1,72 @@
+import re
+
+from sqlalchemy import column, inspect, literal_column, table, text
+
+from models import Book, BOOK_COLUMNS
+
+# External-content FTS5 index over books(name, author); triggers keep it in sync
+# with every insert, delete and name/author update, whichever code path writes.
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        name, author, content='books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, name, author) VALUES (new.id, new.name, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, name, author) VALUES ('delete', old.id, old.name, old.author);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF name, author ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, name, author) VALUES ('delete', old.id, old.name, old.author);
+        INSERT INTO books_fts(rowid, name, author) VALUES (new.id, new.name, new.author);
+    END
+    """,
+]
+
+books_fts = table("books_fts", column("rowid"), column("rank"))
+
+
+def fts_enabled(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def ensure_search_index(engine):
+    """Create the FTS index and its triggers, backfilling existing rows the first time."""
+    if not fts_enabled(engine):
+        return
+    created = not inspect(engine).has_table("books_fts")
+    with engine.begin() as conn:
+        for ddl in FTS_DDL:
+            conn.execute(text(ddl))
+        if created:
+            conn.execute(text("INSERT INTO books_fts(books_fts) VALUES ('rebuild')"))
+
+
+def fts_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every token must match, as a prefix."""
+    tokens = re.findall(r"\w+", q)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_books_query(db, q: str, keyset: bool):
+    """Books matching `q`, best match first; keyset pages are ordered by id instead."""
+    if not fts_enabled(db.get_bind()):
+        query = db.query(*BOOK_COLUMNS).filter((Book.name.like(f"%{q}%")) | (Book.author.like(f"%{q}%")))
+        return query.order_by(Book.id.asc())
+
+    query = (
+        db.query(*BOOK_COLUMNS)
+        .join(books_fts, books_fts.c.rowid == Book.id)
+        .filter(literal_column("books_fts").op("MATCH")(fts_query(q) or '""'))
+    )
+    if keyset:
+        return query.order_by(Book.id.asc())
+    return query.order_by(books_fts.c.rank, Book.id.asc())
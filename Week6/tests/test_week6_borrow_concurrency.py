@@ -0,0 +1,70 @@
+import datetime as dt
+import importlib
+import os
+import sys
+import threading
+
+import jwt
+import pytest
+
+WEEK6 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Flat modules that other weeks also define; purge them so this week's are imported.
+MODULES = ("config", "utils", "models", "router", "main", "cache", "json_provider", "schemas", "exceptions", "search")
+THREADS = 12
+
+
+@pytest.fixture
+def week6(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'library.db'}")
+    monkeypatch.syspath_prepend(WEEK6)
+    for name in MODULES:
+        sys.modules.pop(name, None)
+    main = importlib.import_module("main")
+    config, models = sys.modules["config"], sys.modules["models"]
+    with config.SessionLocal() as db:
+        db.add_all(models.User(username=f"user{i}", password="x") for i in range(THREADS))
+        db.add(models.Book(name="Dune", author="Frank Herbert"))
+        db.commit()
+    yield main, config, models
+    for name in MODULES:
+        sys.modules.pop(name, None)
+
+
+def token(config, username):
+    exp = dt.datetime.now(dt.timezone.utc) + dt.timedelta(minutes=5)
+    return jwt.encode({"sub": username, "exp": exp}, config.SECRET_KEY, algorithm=config.ALGORITHM)
+
+
+def post_concurrently(main, config, path):
+    barrier = threading.Barrier(THREADS)
+    statuses = [None] * THREADS
+
+    def post(i):
+        client = main.app.test_client()
+        headers = {"Authorization": f"Bearer {token(config, f'user{i}')}"}
+        barrier.wait()
+        statuses[i] = client.post(path, headers=headers).status_code
+
+    workers = [threading.Thread(target=post, args=(i,)) for i in range(THREADS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sorted(statuses)
+
+
+def test_concurrent_borrows_take_the_book_once(week6):
+    main, config, models = week6
+    assert post_concurrently(main, config, "/api/v1/books/1/borrow") == [201] + [409] * (THREADS - 1)
+    with config.SessionLocal() as db:
+        assert db.query(models.BorrowRequest).count() == 1
+        assert db.get(models.Book, 1).status == "borrowed"
+
+
+def test_concurrent_returns_free_the_book_once(week6):
+    main, config, models = week6
+    main.app.test_client().post("/api/v1/books/1/borrow", headers={"Authorization": f"Bearer {token(config, 'user0')}"})
+    assert post_concurrently(main, config, "/api/v1/books/1/return") == [200] + [409] * (THREADS - 1)
+    with config.SessionLocal() as db:
+        assert [b.status for b in db.query(models.BorrowRequest)] == ["returned"]
+        assert db.get(models.Book, 1).status == "free"
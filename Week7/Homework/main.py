@@ -6,9 +6,11 @@ from models import db
 from schemas import ma
 from exceptions import register_error_handlers
 from router import bp
+from json_provider import FastJSONProvider
 
 def create_app():
     app = Flask(__name__, static_folder="static", static_url_path="/static")
+    app.json = FastJSONProvider(app)
     app.config.from_object(Config)
     db.init_app(app)
     ma.init_app(app)
@@ -17,6 +17,9 @@ class Book(db.Model):
     author = db.Column(db.String(255), nullable=False)
     status = db.Column(db.String(20), nullable=False, default="free")
 
+# The BookSchema fields, for listings that select plain rows instead of hydrating Book objects.
+BOOK_COLUMNS = (Book.id, Book.book_name, Book.author, Book.status)
+
 class Borrow(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
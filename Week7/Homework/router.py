@@ -1,15 +1,15 @@
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, unset_jwt_cookies, get_jwt
-from models import db, User, Book, Borrow
+from models import db, User, Book, Borrow, BOOK_COLUMNS
 from schemas import ma, UserSchema, BookSchema, BorrowSchema
 from exceptions import BadRequest, NotFound, Conflict, Unauthorized
-from utils import hash_password, verify_password, issue_tokens_response, issue_tokens_cookie_response
+from utils import hash_password, verify_password, issue_tokens_response, issue_tokens_cookie_response, bulk_import
+from utils import EXPORT_FORMATS, stream_export
 
 bp = Blueprint("api", __name__)
 user_schema = UserSchema()
 book_schema = BookSchema()
-books_schema = BookSchema(many=True)
 borrow_schema = BorrowSchema()
 borrows_schema = BorrowSchema(many=True)
 
@@ -71,8 +71,22 @@ def refresh():
 @bp.route("/books", methods=["GET"])
 @jwt_required()
 def list_books():
-    q = Book.query.all()
-    return books_schema.jsonify(q)
+    result = db.session.execute(db.select(*BOOK_COLUMNS))
+    keys = tuple(result.keys())
+    return jsonify([dict(zip(keys, row)) for row in result])
+
+@bp.route("/books/export", methods=["GET"])
+@jwt_required()
+def export_books():
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        raise BadRequest("format must be ndjson or json")
+    query = (
+        db.select(*BOOK_COLUMNS)
+        .order_by(Book.id)
+        .execution_options(yield_per=current_app.config["EXPORT_BATCH_SIZE"])
+    )
+    return stream_export(db.session.execute(query).mappings().partitions(), fmt)
 
 @bp.route("/books/<int:book_id>", methods=["GET"])
 @jwt_required()
@@ -95,6 +109,18 @@ def create_book():
     db.session.commit()
     return book_schema.jsonify(b), 201
 
+@bp.route("/books:bulk", methods=["POST"])
+@jwt_required()
+def bulk_create_books():
+    def validate(row):
+        book_name = row.get("book_name")
+        author = row.get("author")
+        if not isinstance(book_name, str) or not isinstance(author, str) or not book_name or not author:
+            raise ValueError("book_name and author are required")
+        return {"book_name": book_name, "author": author, "status": "free"}
+
+    return jsonify(bulk_import(db.session, Book, validate))
+
 @bp.route("/books/<int:book_id>", methods=["DELETE"])
 @jwt_required()
 def delete_book(book_id):
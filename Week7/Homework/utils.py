@@ -1,6 +1,11 @@
-from flask import jsonify
+import csv
+import io
+import json
+from flask import Response, jsonify, request, current_app, stream_with_context
+from sqlalchemy import insert
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, create_refresh_token, set_access_cookies, set_refresh_cookies
+from exceptions import BadRequest
 
 def hash_password(p):
     return generate_password_hash(p)
@@ -21,3 +26,89 @@ def issue_tokens_cookie_response(identity, additional_claims=None):
     set_access_cookies(resp, access_token)
     set_refresh_cookies(resp, refresh_token)
     return resp
+
+BULK_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+def iter_bulk_rows():
+    """Yield (line, row, error) from an NDJSON or CSV request body, one line at a time."""
+    fmt = BULK_FORMATS.get(request.mimetype)
+    if fmt is None:
+        raise BadRequest("Content-Type must be application/x-ndjson or text/csv")
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="" if fmt == "csv" else None)
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, "too many columns"
+            else:
+                yield reader.line_num, {k: v for k, v in row.items() if v not in ("", None)}, None
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            yield line, None, "invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield line, None, "row must be a JSON object"
+            continue
+        yield line, row, None
+
+def bulk_import(session, model, validate):
+    """Stream the request body into `model` with one executemany INSERT and commit per chunk.
+
+    `validate(row)` returns the column values for a row or raises ValueError; rejected
+    rows are counted and the first BULK_MAX_ERRORS are reported by line number.
+    """
+    chunk_size = current_app.config["BULK_CHUNK_SIZE"]
+    max_errors = current_app.config["BULK_MAX_ERRORS"]
+    report = {"inserted": 0, "failed": 0, "errors": []}
+    chunk = []
+
+    def flush():
+        session.execute(insert(model), chunk)
+        session.commit()
+        report["inserted"] += len(chunk)
+        chunk.clear()
+
+    for line, row, error in iter_bulk_rows():
+        if error is None:
+            try:
+                chunk.append(validate(row))
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            report["failed"] += 1
+            if len(report["errors"]) < max_errors:
+                report["errors"].append({"line": line, "error": error})
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return report
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+def stream_export(partitions, fmt):
+    """Response that writes each batch of row dicts as soon as it is fetched."""
+    def generate():
+        if fmt == "ndjson":
+            for rows in partitions:
+                yield "".join(json.dumps(dict(row)) + "\n" for row in rows)
+            return
+        sep = ""
+        yield "["
+        for rows in partitions:
+            yield sep + ",".join(json.dumps(dict(row)) for row in rows)
+            sep = ","
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt])
@@ -1,6 +1,7 @@
+import json
 from datetime import timedelta
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import (
     JWTManager,
@@ -16,6 +17,7 @@ app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///app.db"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["JWT_SECRET_KEY"] = "aa5ed69bb54da657c749b17bf2910f9b"
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
+app.config["EXPORT_BATCH_SIZE"] = 1000
 
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
@@ -124,6 +126,41 @@ def list_books():
     return jsonify([b.to_dict() for b in books])
 
 
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+def stream_export(partitions, fmt):
+    """Response that writes each batch of row dicts as soon as it is fetched."""
+    def generate():
+        if fmt == "ndjson":
+            for rows in partitions:
+                yield "".join(json.dumps(dict(row)) + "\n" for row in rows)
+            return
+        sep = ""
+        yield "["
+        for rows in partitions:
+            yield sep + ",".join(json.dumps(dict(row)) for row in rows)
+            sep = ","
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt])
+
+
+@app.route("/books/export", methods=["GET"])
+@jwt_required()
+def export_books():
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": "format must be ndjson or json"}), 400
+
+    query = (
+        db.select(Book.id, Book.book_name, Book.author, Book.created_by)
+        .order_by(Book.id)
+        .execution_options(yield_per=app.config["EXPORT_BATCH_SIZE"])
+    )
+    return stream_export(db.session.execute(query).mappings().partitions(), fmt)
+
+
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
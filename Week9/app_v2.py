@@ -1,7 +1,16 @@
-from datetime import datetime, timedelta
+import heapq
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import (
     JWTManager, create_access_token, create_refresh_token,
     jwt_required, get_jwt_identity, get_jwt
@@ -10,11 +19,17 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 
 app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///app_v2.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///app_v2.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["JWT_SECRET_KEY"] = "replace-this-with-a-strong-secret-for-v2"
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(minutes=60)
 app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=30)
+app.config["TOKEN_BLOCKLIST_SYNC_SECONDS"] = 5
+app.config["IDEMPOTENCY_REPLAY_TTL"] = timedelta(hours=24)
+app.config["IDEMPOTENCY_CACHE_SIZE"] = 10000
+app.config["PAYMENT_BATCH_MAX_ITEMS"] = 100
+app.config["BOOKS_PER_PAGE_MAX"] = 500
+app.config["BOOK_COUNT_TTL"] = 30
 
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
@@ -43,22 +58,191 @@ class Payment(db.Model):
     user_id = db.Column(db.Integer, nullable=False)
     book_id = db.Column(db.Integer, nullable=False)
     amount_cents = db.Column(db.Integer, nullable=False)
-    idempotency_key = db.Column(db.String(128), nullable=True, unique=True)
+    idempotency_key = db.Column(db.String(128), nullable=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey("payment_batch.id"), nullable=True, index=True)
+    batch_position = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Keys are per user, so one user's key never collides with, or reveals, another's.
+    __table_args__ = (db.UniqueConstraint("user_id", "idempotency_key"),)
+
+class PaymentBatch(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    idempotency_key = db.Column(db.String(128), nullable=True)
+    book_ids = db.Column(db.Text, nullable=False)  # comma-separated, in request order
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Batch keys live here, apart from single-payment keys on Payment.
+    __table_args__ = (db.UniqueConstraint("user_id", "idempotency_key"),)
+
 class TokenBlocklist(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(36), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class RevokedTokens:
+    """In-memory copy of TokenBlocklist, so most revocation checks need no query.
+
+    Loaded from the table on first use and updated by revoke_refresh. Other workers
+    revoke tokens too, so every `sync_interval` seconds the rows added since the last
+    one seen are pulled in: a revocation reaches every process within that interval.
+    An entry is dropped once the token it revokes has expired, because JWT validation
+    rejects that token from then on anyway. Blocklist rows carry no expiry, so rows
+    read from the table are kept for the longest token lifetime after they were written.
+    """
+
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+        self._expires = {}  # jti -> exp (epoch seconds)
+        self._heap = []  # (exp, jti), earliest expiry first
+        self._last_id = 0
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def add(self, jti, exp):
+        with self._lock:
+            self._add(jti, exp)
+
+    def __contains__(self, jti):
+        now = time.time()
+        with self._lock:
+            if self._synced_at is None or now - self._synced_at >= self.sync_interval:
+                self._sync(now)
+            while self._heap and self._heap[0][0] <= now:
+                exp, old = heapq.heappop(self._heap)
+                if self._expires.get(old) == exp:
+                    del self._expires[old]
+            return jti in self._expires
+
+    def _add(self, jti, exp):
+        if exp > self._expires.get(jti, 0):
+            self._expires[jti] = exp
+            heapq.heappush(self._heap, (exp, jti))
+
+    def _sync(self, now):
+        lifetime = max(app.config["JWT_ACCESS_TOKEN_EXPIRES"], app.config["JWT_REFRESH_TOKEN_EXPIRES"])
+        cutoff = datetime.utcnow() - lifetime
+        rows = (
+            db.session.query(TokenBlocklist.id, TokenBlocklist.jti, TokenBlocklist.created_at)
+            .filter(TokenBlocklist.id > self._last_id, TokenBlocklist.created_at >= cutoff)
+            .order_by(TokenBlocklist.id)
+        )
+        for row_id, jti, created_at in rows:
+            self._add(jti, (created_at.replace(tzinfo=timezone.utc) + lifetime).timestamp())
+            self._last_id = row_id
+        self._synced_at = now
+
+revoked_tokens = RevokedTokens(app.config["TOKEN_BLOCKLIST_SYNC_SECONDS"])
+
+class IdempotentResponses:
+    """Completed payment responses by (Idempotency-Key, user, book), replayed byte-for-byte.
+
+    This only saves the database round-trips for retries: the unique constraint on
+    (Payment.user_id, Payment.idempotency_key) is what makes a key single-use, and a
+    miss here falls back to rebuilding the response from the stored payment.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (key, user_id, book_id) -> (expires_at, status, body)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key, status, body):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, status, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+idempotent_responses = IdempotentResponses(
+    app.config["IDEMPOTENCY_CACHE_SIZE"], app.config["IDEMPOTENCY_REPLAY_TTL"].total_seconds()
+)
+
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
     jti = jwt_payload.get("jti")
     if not jti:
         return True
-    return TokenBlocklist.query.filter_by(jti=jti).first() is not None
+    return jti in revoked_tokens
+
+class BookCount:
+    """COUNT(*) of books for list pagination, shared across requests.
+
+    A commit that inserted or deleted Book rows through the ORM invalidates it (bulk
+    writes must call `invalidate` themselves); the TTL bounds staleness for writes
+    made elsewhere. A count read while an invalidation happens is returned but not
+    cached, so a reader can't pin the pre-commit value for a whole TTL.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._value = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._value is not None and self._expires_at > time.monotonic():
+                return self._value
+            generation = self._generation
+        value = db.session.scalar(select(func.count(Book.id)))
+        with self._lock:
+            if generation == self._generation:
+                self._value = value
+                self._expires_at = time.monotonic() + self.ttl
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._value = None
+
+book_count = BookCount(app.config["BOOK_COUNT_TTL"])
+
+@event.listens_for(db.session, "after_flush")
+def mark_book_count_stale(session, flush_context):
+    if any(isinstance(obj, Book) for obj in (*session.new, *session.deleted)):
+        session.info["book_count_stale"] = True
+
+@event.listens_for(db.session, "after_commit")
+def invalidate_book_count(session):
+    if session.info.pop("book_count_stale", False):
+        book_count.invalidate()
+
+@event.listens_for(db.session, "after_rollback")
+def forget_book_count_writes(session):
+    session.info.pop("book_count_stale", None)
+
+BOOK_LIST_QUERY = select(Book.id, Book.title, Book.author, Book.price_cents).order_by(Book.id)
+
+@lru_cache(maxsize=4096)
+def format_price(price_cents):
+    return f"{price_cents / 100:.2f}"
+
+def book_list_item(row):
+    book_id, title, author, price_cents = row
+    return {
+        "id": book_id,
+        "title": title,
+        "author": author,
+        "price_cents": price_cents,
+        "price": format_price(price_cents)
+    }
 
-@app.before_first_request
 def seed_books():
     if Book.query.count() == 0:
         sample = [
@@ -70,6 +254,12 @@ def seed_books():
         ]
         db.session.bulk_save_objects(sample)
         db.session.commit()
+        book_count.invalidate()
+
+# before_first_request is gone in Flask 2.3+, so create and seed the tables at import.
+with app.app_context():
+    db.create_all()
+    seed_books()
 
 def deprecation_headers():
     return {
@@ -124,9 +314,10 @@ def refresh_v2():
 @app.route("/v2/users/logout_refresh", methods=["POST"])
 @jwt_required(refresh=True)
 def revoke_refresh():
-    jti = get_jwt()["jti"]
-    db.session.add(TokenBlocklist(jti=jti))
+    token = get_jwt()
+    db.session.add(TokenBlocklist(jti=token["jti"]))
     db.session.commit()
+    revoked_tokens.add(token["jti"], token["exp"])
     resp = jsonify({"msg": "refresh token revoked"})
     resp.headers.update(deprecation_headers())
     return resp, 200
@@ -153,79 +344,198 @@ def list_books_v2():
     except Exception:
         page = 1
     try:
-        per_page = min(50, max(1, int(request.args.get("per_page", 10))))
+        per_page = min(app.config["BOOKS_PER_PAGE_MAX"], max(1, int(request.args.get("per_page", 10))))
     except Exception:
         per_page = 10
-    qs = Book.query.order_by(Book.id)
-    pagination = qs.paginate(page=page, per_page=per_page, error_out=False)
-    items = []
-    for b in pagination.items:
-        items.append({
-            "id": b.id,
-            "title": b.title,
-            "author": b.author,
-            "price_cents": b.price_cents,
-            "price": f"{b.price_cents/100:.2f}"
-        })
+    total = book_count.get()
+    rows = db.session.execute(BOOK_LIST_QUERY.limit(per_page).offset((page - 1) * per_page))
     resp = jsonify({
-        "items": items,
+        "items": list(map(book_list_item, rows)),
         "page": page,
         "per_page": per_page,
-        "total": pagination.total,
-        "pages": pagination.pages
+        "total": total,
+        "pages": math.ceil(total / per_page)
     })
     resp.headers.update(deprecation_headers())
     return resp, 200
 
+def payment_dict(payment):
+    return {
+        "id": payment.id,
+        "user_id": payment.user_id,
+        "book_id": payment.book_id,
+        "amount_cents": payment.amount_cents,
+        "created_at": payment.created_at.isoformat()
+    }
+
+def payment_response(body, status=201, replayed=False):
+    resp = jsonify(body)
+    resp.status_code = status
+    if replayed:
+        resp.headers["Idempotent-Replayed"] = "true"
+    resp.headers.update(deprecation_headers())
+    return resp
+
+def batch_response(payments, replayed=False):
+    return payment_response({
+        "msg": "payments recorded (mock)",
+        "payments": payments,
+        "total_cents": sum(p["amount_cents"] for p in payments)
+    }, replayed=replayed)
+
+def cached_replay(cached):
+    status, body = cached
+    resp = app.response_class(body, status=status, mimetype="application/json")
+    resp.headers["Idempotent-Replayed"] = "true"
+    resp.headers.update(deprecation_headers())
+    return resp
+
+def parse_book_id(value):
+    """`value` as an int id, accepting 1 and 1.0 alike, or None if it isn't a whole number."""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def replay_payment(cache_key):
+    """Response for a key that already has a payment, or a 422 if it belongs to another request."""
+    idempotency_key, user_id, book_id = cache_key
+    existing = Payment.query.filter_by(user_id=int(user_id), idempotency_key=idempotency_key).first()
+    if existing is None:
+        # The conflicting INSERT was rolled back before we could read it.
+        return jsonify({"msg": "a request with this Idempotency-Key is in progress, retry"}), 409
+    if existing.book_id != book_id:
+        return jsonify({"msg": "Idempotency-Key was already used for a different request"}), 422
+    resp = payment_response({"msg": "payment recorded (mock)", "payment": payment_dict(existing)}, replayed=True)
+    idempotent_responses.set(cache_key, resp.status_code, resp.get_data())
+    return resp
+
 @app.route("/v2/payments", methods=["POST"])
 @jwt_required()
 def create_payment_v2():
     user_id = get_jwt_identity()
     data = request.get_json() or {}
-    book_id = data.get("book_id")
-    if not book_id:
+    if not data.get("book_id"):
         return jsonify({"msg": "book_id required"}), 400
-    book = Book.query.get(book_id)
-    if not book:
-        return jsonify({"msg": "book not found"}), 404
+    book_id = parse_book_id(data["book_id"])
+    if book_id is None:
+        return jsonify({"msg": "book_id must be an integer"}), 400
 
     idempotency_key = request.headers.get("Idempotency-Key")
+    cache_key = (idempotency_key, str(user_id), book_id)
     if idempotency_key:
-        existing = Payment.query.filter_by(idempotency_key=idempotency_key).first()
-        if existing:
-            resp = jsonify({
-                "msg": "payment already processed for this idempotency key",
-                "payment": {
-                    "id": existing.id,
-                    "user_id": existing.user_id,
-                    "book_id": existing.book_id,
-                    "amount_cents": existing.amount_cents,
-                    "created_at": existing.created_at.isoformat()
-                }
-            })
-            resp.headers.update(deprecation_headers())
-            return resp, 200
+        cached = idempotent_responses.get(cache_key)
+        if cached:
+            return cached_replay(cached)
+
+    book = Book.query.get(book_id)
+    if not book:
+        return jsonify({"msg": "book not found"}), 404
 
     payment = Payment(
-        user_id=user_id,
+        user_id=int(user_id),
         book_id=book.id,
         amount_cents=book.price_cents,
-        idempotency_key=idempotency_key
+        idempotency_key=idempotency_key,
+        created_at=datetime.utcnow()
     )
     db.session.add(payment)
+    try:
+        # The INSERT reserves the key: a concurrent retry with the same key fails
+        # here on the unique constraint and replays the winner's payment instead.
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        if not idempotency_key:
+            raise
+        return replay_payment(cache_key)
+    resp = payment_response({"msg": "payment recorded (mock)", "payment": payment_dict(payment)})
     db.session.commit()
-    resp = jsonify({
-        "msg": "payment recorded (mock)",
-        "payment": {
-            "id": payment.id,
-            "user_id": payment.user_id,
-            "book_id": payment.book_id,
-            "amount_cents": payment.amount_cents,
-            "created_at": payment.created_at.isoformat()
+    if idempotency_key:
+        idempotent_responses.set(cache_key, resp.status_code, resp.get_data())
+    return resp
+
+def replay_batch(cache_key):
+    """Response for a batch key that was already used, or a 422 if it was for other books."""
+    idempotency_key, user_id, book_ids = cache_key
+    batch = PaymentBatch.query.filter_by(user_id=int(user_id), idempotency_key=idempotency_key).first()
+    if batch is None:
+        return jsonify({"msg": "a request with this Idempotency-Key is in progress, retry"}), 409
+    if batch.book_ids != book_ids:
+        return jsonify({"msg": "Idempotency-Key was already used for a different request"}), 422
+    existing = Payment.query.filter_by(batch_id=batch.id).order_by(Payment.batch_position)
+    resp = batch_response([payment_dict(p) for p in existing], replayed=True)
+    idempotent_responses.set(cache_key, resp.status_code, resp.get_data())
+    return resp
+
+@app.route("/v2/payments:batch", methods=["POST"])
+@jwt_required()
+def create_payments_batch_v2():
+    """Pay for several books at once: one price query, one multi-row INSERT, one commit.
+
+    The batch gets a PaymentBatch row holding its Idempotency-Key, inserted in the
+    same transaction as the payments, so the unique constraint reserves the whole batch.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    book_ids = data.get("book_ids")
+    max_items = app.config["PAYMENT_BATCH_MAX_ITEMS"]
+    if not isinstance(book_ids, list) or not book_ids:
+        return jsonify({"msg": "book_ids required"}), 400
+    if len(book_ids) > max_items:
+        return jsonify({"msg": f"at most {max_items} book_ids per batch"}), 400
+    if not all(isinstance(b, int) and not isinstance(b, bool) for b in book_ids):
+        return jsonify({"msg": "book_ids must be integers"}), 400
+
+    idempotency_key = request.headers.get("Idempotency-Key")
+    fingerprint = ",".join(map(str, book_ids))
+    cache_key = (idempotency_key, str(user_id), fingerprint)
+    if idempotency_key:
+        cached = idempotent_responses.get(cache_key)
+        if cached:
+            return cached_replay(cached)
+
+    prices = dict(db.session.query(Book.id, Book.price_cents).filter(Book.id.in_(set(book_ids))))
+    missing = sorted(set(book_ids) - prices.keys())
+    if missing:
+        return jsonify({"msg": "book not found", "book_ids": missing}), 404
+
+    now = datetime.utcnow()
+    batch = PaymentBatch(user_id=int(user_id), idempotency_key=idempotency_key, book_ids=fingerprint, created_at=now)
+    db.session.add(batch)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        if not idempotency_key:
+            raise
+        return replay_batch(cache_key)
+    rows = [
+        {
+            "user_id": batch.user_id,
+            "book_id": book_id,
+            "amount_cents": prices[book_id],
+            "batch_id": batch.id,
+            "batch_position": i,
+            "created_at": now
         }
-    })
-    resp.headers.update(deprecation_headers())
-    return resp, 201
+        for i, book_id in enumerate(book_ids)
+    ]
+    # Map ids back by batch_position: sort_by_parameter_order would make SQLAlchemy
+    # send one INSERT per row on SQLite instead of a single multi-row INSERT.
+    ids = dict(db.session.execute(insert(Payment).returning(Payment.batch_position, Payment.id), rows).all())
+    payments = [
+        {"id": ids[i], "user_id": row["user_id"], "book_id": row["book_id"],
+         "amount_cents": row["amount_cents"], "created_at": now.isoformat()}
+        for i, row in enumerate(rows)
+    ]
+    resp = batch_response(payments)
+    db.session.commit()
+    if idempotency_key:
+        idempotent_responses.set(cache_key, resp.status_code, resp.get_data())
+    return resp
 
 if __name__ == "__main__":
     app.run(debug=True, port=5001)
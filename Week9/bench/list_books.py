@@ -0,0 +1,75 @@
+"""GET /v2/books with the cached count and projected rows vs the old paginate() path.
+
+    python Week9/bench/list_books.py [books] [requests]
+
+Seeds a throwaway SQLite file (or $DATABASE_URL) and times both paths through the
+test client. The old path (COUNT(*) per page, full Book objects, float formatting
+per item) is mounted at /bench/paginate for the comparison.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+WEEK9 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/app_v2.db")
+sys.path.insert(0, WEEK9)
+
+from flask import jsonify, request  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app_v2 import Book, app, book_count, db, deprecation_headers  # noqa: E402
+
+
+@app.get("/bench/paginate")
+def paginate_books():
+    page = max(1, int(request.args.get("page", 1)))
+    per_page = min(app.config["BOOKS_PER_PAGE_MAX"], max(1, int(request.args.get("per_page", 10))))
+    pagination = Book.query.order_by(Book.id).paginate(page=page, per_page=per_page, error_out=False)
+    items = []
+    for b in pagination.items:
+        items.append({
+            "id": b.id,
+            "title": b.title,
+            "author": b.author,
+            "price_cents": b.price_cents,
+            "price": f"{b.price_cents/100:.2f}"
+        })
+    resp = jsonify({
+        "items": items,
+        "page": page,
+        "per_page": per_page,
+        "total": pagination.total,
+        "pages": pagination.pages
+    })
+    resp.headers.update(deprecation_headers())
+    return resp, 200
+
+
+def timed(client, path, requests):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        assert client.get(path).status_code == 200
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(samples)
+
+
+def main(books=100_000, requests=200):
+    with app.app_context():
+        rows = [{"title": f"Book {i}", "author": f"Author {i % 100}", "price_cents": 1000 + i % 5000} for i in range(books)]
+        db.session.execute(insert(Book), rows)
+        db.session.commit()
+        book_count.invalidate()
+
+    client = app.test_client()
+    for query in ("page=1&per_page=50", "page=1000&per_page=50", "page=1&per_page=500"):
+        assert client.get(f"/v2/books?{query}").get_json() == client.get(f"/bench/paginate?{query}").get_json()
+        old = timed(client, f"/bench/paginate?{query}", requests)
+        new = timed(client, f"/v2/books?{query}", requests)
+        print(f"  {query:<24} paginate() {old:6.2f} ms   list_books_v2 {new:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,78 @@
+import importlib
+import os
+import sys
+import threading
+
+import pytest
+
+WEEK9 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app_v2(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'app_v2.db'}")
+    monkeypatch.syspath_prepend(WEEK9)
+    sys.modules.pop("app_v2", None)
+    module = importlib.import_module("app_v2")
+    yield module
+    sys.modules.pop("app_v2", None)
+
+
+def auth_headers(module, user_id, key):
+    with module.app.app_context():
+        token = module.create_access_token(identity=str(user_id))
+    return {"Authorization": f"Bearer {token}", "Idempotency-Key": key}
+
+
+def test_concurrent_retries_create_one_payment(app_v2):
+    threads = 16
+    headers = auth_headers(app_v2, 1, "same-key")
+    barrier = threading.Barrier(threads)
+    responses = [None] * threads
+
+    def pay(i):
+        client = app_v2.app.test_client()
+        barrier.wait()
+        responses[i] = client.post("/v2/payments", json={"book_id": 1}, headers=headers)
+
+    workers = [threading.Thread(target=pay, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert [r.status_code for r in responses] == [201] * threads
+    assert len({r.json["payment"]["id"] for r in responses}) == 1
+    assert sum("Idempotent-Replayed" not in r.headers for r in responses) == 1
+    with app_v2.app.app_context():
+        assert app_v2.Payment.query.count() == 1
+
+
+def test_key_is_scoped_to_user_and_book_id_is_normalized(app_v2):
+    client = app_v2.app.test_client()
+    first = client.post("/v2/payments", json={"book_id": 1}, headers=auth_headers(app_v2, 1, "k"))
+    retry = client.post("/v2/payments", json={"book_id": 1.0}, headers=auth_headers(app_v2, 1, "k"))
+    other_book = client.post("/v2/payments", json={"book_id": 2}, headers=auth_headers(app_v2, 1, "k"))
+    other_user = client.post("/v2/payments", json={"book_id": 2}, headers=auth_headers(app_v2, 2, "k"))
+
+    assert first.status_code == 201
+    assert retry.status_code == 201 and retry.json == first.json
+    assert other_book.status_code == 422
+    assert other_user.status_code == 201
+    assert other_user.json["payment"]["id"] != first.json["payment"]["id"]
+
+
+def test_batch_key_does_not_collide_with_payment_keys(app_v2):
+    client = app_v2.app.test_client()
+    single = client.post("/v2/payments", json={"book_id": 1}, headers=auth_headers(app_v2, 1, "b2:0"))
+    batch = client.post("/v2/payments:batch", json={"book_ids": [3, 1, 3]}, headers=auth_headers(app_v2, 1, "b2"))
+    app_v2.idempotent_responses._entries.clear()
+    replay = client.post("/v2/payments:batch", json={"book_ids": [3, 1, 3]}, headers=auth_headers(app_v2, 1, "b2"))
+    other = client.post("/v2/payments:batch", json={"book_ids": [3, 1]}, headers=auth_headers(app_v2, 1, "b2"))
+
+    assert single.status_code == 201
+    assert batch.status_code == 201
+    assert [p["book_id"] for p in batch.json["payments"]] == [3, 1, 3]
+    assert replay.status_code == 201 and replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json["payments"] == batch.json["payments"]
+    assert other.status_code == 422
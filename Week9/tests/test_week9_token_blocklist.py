@@ -0,0 +1,36 @@
+import importlib
+import os
+import sys
+
+import pytest
+from flask_jwt_extended import decode_token
+
+WEEK9 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app_v2(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'app_v2.db'}")
+    monkeypatch.syspath_prepend(WEEK9)
+    sys.modules.pop("app_v2", None)
+    module = importlib.import_module("app_v2")
+    yield module
+    sys.modules.pop("app_v2", None)
+
+
+def test_revocation_by_another_worker_is_picked_up_after_sync_interval(app_v2):
+    with app_v2.app.app_context():
+        token = app_v2.create_refresh_token(identity="1")
+        jti = decode_token(token)["jti"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client = app_v2.app.test_client()
+    assert client.post("/v2/users/refresh", headers=headers).status_code == 200
+
+    # Another process revokes the token: only the table changes, not this process's copy.
+    with app_v2.app.app_context():
+        app_v2.db.session.add(app_v2.TokenBlocklist(jti=jti))
+        app_v2.db.session.commit()
+    assert client.post("/v2/users/refresh", headers=headers).status_code == 200
+
+    app_v2.revoked_tokens._synced_at -= app_v2.revoked_tokens.sync_interval
+    assert client.post("/v2/users/refresh", headers=headers).status_code == 401